@@ -72,6 +72,14 @@ def worker_int(worker):
     """Called when a worker receives the SIGINT or SIGQUIT signal."""
     worker.log.info("Worker received SIGINT or SIGQUIT")
 
+def worker_exit(server, worker):
+    """Called in the worker process just after it has exited."""
+    # Workers end with os._exit(), so atexit never flushes the queued log records
+    import sys
+    wsgi = sys.modules.get('wsgi')
+    if wsgi is not None:
+        wsgi.stop_log_listener()
+
 # Security
 limit_request_line = 4094
 limit_request_fields = 100
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the indexed is_event_generated flag to the LogbookEntry table
+"""
+
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.app import create_app, db
+
+INDEX_NAME = 'ix_logbook_entry_event_generated'
+
+def migrate_logbook_event_generated():
+    """Add and backfill the is_event_generated column and its partial index if they don't exist."""
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [c['name'] for c in inspector.get_columns('logbook_entry')]
+            indexes = [i['name'] for i in inspector.get_indexes('logbook_entry')]
+
+            with db.engine.connect() as conn:
+                if 'is_event_generated' not in columns:
+                    print("Adding is_event_generated column to LogbookEntry table...")
+                    conn.execute(db.text(
+                        "ALTER TABLE logbook_entry ADD COLUMN is_event_generated BOOLEAN NOT NULL DEFAULT FALSE"
+                    ))
+
+                    # Event-generated entries are linked from their events; older ones
+                    # were only marked in their remarks
+                    result = conn.execute(db.text(
+                        "UPDATE logbook_entry SET is_event_generated = TRUE "
+                        "WHERE remarks LIKE '%Generated from device events%' "
+                        "OR EXISTS (SELECT 1 FROM event WHERE event.logbook_entry_id = logbook_entry.id)"
+                    ))
+                    print(f"✅ Marked {result.rowcount} existing entries as event-generated")
+                else:
+                    print("✅ is_event_generated column already exists")
+
+                if INDEX_NAME not in indexes:
+                    print(f"Creating {INDEX_NAME}...")
+                    conn.execute(db.text(
+                        f"CREATE INDEX {INDEX_NAME} ON logbook_entry (device_id) WHERE is_event_generated"
+                    ))
+                else:
+                    print(f"✅ {INDEX_NAME} already exists")
+
+                conn.commit()
+
+            print("✅ LogbookEntry is_event_generated flag is up to date")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Starting LogbookEntry is_event_generated migration...")
+    success = migrate_logbook_event_generated()
+
+    if success:
+        print("\n✅ Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to index LogbookEntry (takeoff_datetime, id) for keyset pagination
+"""
+
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.app import create_app, db
+
+INDEX_NAME = 'ix_logbook_entry_takeoff_datetime_id'
+
+def migrate_logbook_keyset_index():
+    """Create the (takeoff_datetime, id) index on the LogbookEntry table if it doesn't exist."""
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            # Check if the index already exists
+            inspector = db.inspect(db.engine)
+            indexes = [i['name'] for i in inspector.get_indexes('logbook_entry')]
+
+            if INDEX_NAME not in indexes:
+                print(f"Creating {INDEX_NAME} on LogbookEntry table...")
+
+                with db.engine.connect() as conn:
+                    conn.execute(db.text(
+                        f"CREATE INDEX {INDEX_NAME} ON logbook_entry (takeoff_datetime, id)"
+                    ))
+                    conn.commit()
+
+                print(f"✅ Successfully created {INDEX_NAME}")
+            else:
+                print(f"✅ {INDEX_NAME} already exists")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Starting LogbookEntry keyset index migration...")
+    success = migrate_logbook_keyset_index()
+
+    if success:
+        print("\n✅ Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
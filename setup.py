@@ -15,6 +15,7 @@ setup(
     extras_require={
         "dev": [
             "pytest>=7.4.0",
+            "pytest-xdist>=3.3.0",
             "black>=23.0.0",
             "flake8>=6.0.0",
             "mypy>=1.5.0",
@@ -43,8 +43,8 @@ def load_environment_variables():
 load_environment_variables()
 
 
-def create_app():
-    """Create and configure the Flask application."""
+def create_app(config=None):
+    """Create and configure the Flask application; ``config`` overrides the settings below."""
     # Configure Flask to look for templates in the parent directory
     import os
     template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
@@ -56,7 +56,17 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///kanardiacloud.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Server databases: recycle connections instead of pinging on every checkout,
+        # and reuse the most recently returned connection so idle ones can age out
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.environ.get('DATABASE_POOL_SIZE') or 20),
+            'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW') or 10),
+            'pool_pre_ping': False,
+            'pool_recycle': 1800,
+            'pool_use_lifo': True,
+        }
+
     # Email configuration
     app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT') or 587)
@@ -68,6 +78,9 @@ def create_app():
     # API configuration
     app.config['EXTERNAL_API_KEY'] = os.environ.get('EXTERNAL_API_KEY')
     
+    if config:
+        app.config.update(config)
+    
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
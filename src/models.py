@@ -2,11 +2,16 @@
 Database models for KanardiaCloud
 """
 
+import base64
+import json
+from functools import cached_property
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer
+from sqlalchemy import event, tuple_
+from sqlalchemy.orm import joinedload
 from src.app import db
 
 
@@ -82,7 +87,7 @@ class Device(db.Model):
     model = db.Column(db.String(100))
     serial_number = db.Column(db.String(100))
     registration = db.Column(db.String(20))  # For aircraft
-    external_device_id = db.Column(db.String(100))  # ThingsBoard device ID for sync
+    external_device_id = db.Column(db.String(100), index=True)  # ThingsBoard device ID for sync
     current_logger_page = db.Column(db.BigInteger, nullable=True)  # Current page of device logger
     is_active = db.Column(db.Boolean, default=True)
     
@@ -311,6 +316,21 @@ class Pilot(db.Model):
         ).count()
 
 
+# Section skeleton for newly created checklists, serialized once in compact form
+DEFAULT_CHECKLIST_JSON = json.dumps({
+    "Language": "en-us",
+    "Voice": "Linda",
+    "Root": {
+        "Type": 0,
+        "Name": "Root",
+        "Children": [
+            {"Type": 0, "Name": name, "Children": []}
+            for name in ("Pre-flight", "In-flight", "Post-flight", "Emergency", "Reference")
+        ]
+    }
+}, separators=(',', ':'))
+
+
 class Checklist(db.Model):
     """Checklist model for flight procedures."""
     
@@ -397,6 +417,7 @@ class LogbookEntry(db.Model):
     remarks = db.Column(db.Text)
     pilot_name = db.Column(db.String(100), nullable=True)  # Name of pilot as recorded in logbook
     flight_points_fetched = db.Column(db.Boolean, default=False)  # Track if flight points fetch was attempted
+    is_event_generated = db.Column(db.Boolean, default=False, nullable=False)  # Built from device events by the sync service
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -408,15 +429,36 @@ class LogbookEntry(db.Model):
     # Note: user relationship is handled by existing 'pilot' backref from User model
     device = db.relationship('Device', backref=db.backref('device_logbook_entries', lazy=True))
     user = db.relationship('User', overlaps="logbook_entries,pilot")
+    # Mapping for (device_id, pilot_name); only read when eager-loaded, see get_pilot_mapping()
+    pilot_mapping = db.relationship(
+        'Pilot', viewonly=True, uselist=False,
+        primaryjoin='and_(LogbookEntry.device_id == foreign(Pilot.device_id), '
+                    'LogbookEntry.pilot_name == foreign(Pilot.pilot_name))'
+    )
+    
+    __table_args__ = (
+        # Newest-first listings seek on this index instead of skipping rows with OFFSET
+        db.Index('ix_logbook_entry_takeoff_datetime_id', 'takeoff_datetime', 'id'),
+        # A device's event-generated entries, without indexing every manual entry
+        db.Index('ix_logbook_entry_event_generated', 'device_id',
+                 sqlite_where=is_event_generated, postgresql_where=is_event_generated),
+    )
     
     def get_calculated_flight_time(self) -> float:
-        """Calculate flight time in hours from takeoff and landing datetime."""
+        """Calculate flight time in hours from takeoff and landing datetime.
+        
+        The result is kept on the instance until either datetime changes.
+        """
         if not self.takeoff_datetime or not self.landing_datetime:
             return self.flight_time or 0.0
         
-        # Calculate flight duration in hours
-        flight_duration = self.landing_datetime - self.takeoff_datetime
-        return round(flight_duration.total_seconds() / 3600, 2)
+        calculated = self.__dict__.get('_calculated_flight_time')
+        if calculated is None:
+            # Calculate flight duration in hours
+            flight_duration = self.landing_datetime - self.takeoff_datetime
+            calculated = round(flight_duration.total_seconds() / 3600, 2)
+            self.__dict__['_calculated_flight_time'] = calculated
+        return calculated
     
     def get_aircraft_info(self):
         """Get aircraft information from linked device or stored values."""
@@ -433,37 +475,44 @@ class LogbookEntry(db.Model):
     def get_pilot_mapping(self):
         """Get pilot mapping if pilot_name and device are available."""
         if self.pilot_name and self.device_id:
-            return Pilot.query.filter_by(
+            # Listings load the mappings of a whole page with selectinload(LogbookEntry.pilot_mapping)
+            if 'pilot_mapping' in self.__dict__:
+                return self.__dict__['pilot_mapping']
+            return Pilot.query.options(joinedload(Pilot.user)).filter_by(
                 pilot_name=self.pilot_name,
                 device_id=self.device_id
             ).first()
         return None
     
-    def get_actual_pilot_user(self):
-        """Get the actual user who is the pilot for this entry."""
+    def get_pilot_info(self) -> Tuple[Optional['Pilot'], Optional[User]]:
+        """Get the pilot mapping and the actual pilot user from one mapping lookup."""
         pilot_mapping = self.get_pilot_mapping()
         if pilot_mapping:
-            return pilot_mapping.user
+            return pilot_mapping, pilot_mapping.user
         
         # If there's a pilot name but no mapping, don't fall back to device owner
         # This keeps unknown pilots unlinked
         if self.pilot_name:
-            return None
+            return None, None
             
         # If no pilot name is specified, fall back to the entry's user_id
-        return self.user
+        return None, self.user
     
-    @property
+    def get_actual_pilot_user(self):
+        """Get the actual user who is the pilot for this entry."""
+        return self.get_pilot_info()[1]
+    
+    @cached_property
     def date(self) -> datetime.date:
         """Get flight date from takeoff datetime for backward compatibility."""
         return self.takeoff_datetime.date() if self.takeoff_datetime else None
     
-    @property
+    @cached_property
     def takeoff_time(self) -> datetime.time:
         """Get takeoff time from takeoff datetime for backward compatibility."""
         return self.takeoff_datetime.time() if self.takeoff_datetime else None
     
-    @property
+    @cached_property
     def landing_time(self) -> datetime.time:
         """Get landing time from landing datetime for backward compatibility."""
         return self.landing_datetime.time() if self.landing_datetime else None
@@ -473,10 +522,92 @@ class LogbookEntry(db.Model):
         """Check if this entry was synced from a device."""
         return self.device_id is not None
     
+    def page_cursor(self) -> str:
+        """Opaque cursor for the entries older (``after``) or newer (``before``) than this one."""
+        key = f'{self.takeoff_datetime.isoformat()}|{self.id}'
+        return base64.urlsafe_b64encode(key.encode()).decode()
+    
+    @staticmethod
+    def _parse_page_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+        """Decode a page cursor into its (takeoff_datetime, id) key, or None if it is unreadable."""
+        try:
+            takeoff, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(takeoff), int(entry_id)
+        except ValueError:  # also covers bad base64 and bad UTF-8
+            return None
+    
+    @classmethod
+    def seek_page(cls, query, after: Optional[str] = None, per_page: int = 20,
+                  before: Optional[str] = None) -> 'LogbookPage':
+        """Return one newest-first page of ``query``, older than ``after`` or newer than ``before``.
+        
+        Keyset pagination: the page is found with an index range seek on
+        (takeoff_datetime, id), so deep pages cost the same as the first one.
+        A ``before`` page is read in ascending order from the cursor and then
+        reversed. An unreadable cursor starts from the first page.
+        """
+        key = cls._parse_page_cursor(before) if before else None
+        if key:
+            # Walk towards newer entries, then show them newest first
+            items = query.filter(tuple_(cls.takeoff_datetime, cls.id) > key).order_by(
+                cls.takeoff_datetime, cls.id
+            ).limit(per_page + 1).all()
+            has_newer = len(items) > per_page
+            del items[per_page:]
+            items.reverse()
+            return LogbookPage(
+                items,
+                items[-1].page_cursor() if items else None,
+                items[0].page_cursor() if has_newer else None,
+            )
+        
+        query = query.order_by(cls.takeoff_datetime.desc(), cls.id.desc())
+        key = cls._parse_page_cursor(after) if after else None
+        if key:
+            query = query.filter(tuple_(cls.takeoff_datetime, cls.id) < key)
+        
+        # One extra row tells whether another page follows
+        items = query.limit(per_page + 1).all()
+        has_older = len(items) > per_page
+        del items[per_page:]
+        return LogbookPage(
+            items,
+            items[-1].page_cursor() if has_older else None,
+            items[0].page_cursor() if key and items else None,
+        )
+    
     def __repr__(self):
         return f'<LogbookEntry {self.date} {self.aircraft_registration}>'
 
 
+class LogbookPage(NamedTuple):
+    """One page of a keyset-paginated logbook listing."""
+    
+    items: List[LogbookEntry]
+    next_cursor: Optional[str]  # None on the last page
+    prev_cursor: Optional[str] = None  # None on the first page
+
+
+# Values LogbookEntry derives from takeoff_datetime/landing_datetime and keeps in __dict__
+_DERIVED_TIME_ATTRS = ('_calculated_flight_time', 'date', 'takeoff_time', 'landing_time')
+
+
+@event.listens_for(LogbookEntry.takeoff_datetime, 'set')
+@event.listens_for(LogbookEntry.landing_datetime, 'set')
+def _invalidate_derived_times(target, value, oldvalue, initiator):
+    """Forget the memoized flight time and date/time shims when takeoff or landing changes."""
+    for name in _DERIVED_TIME_ATTRS:
+        target.__dict__.pop(name, None)
+
+
+@event.listens_for(LogbookEntry, 'expire')
+@event.listens_for(LogbookEntry, 'refresh')
+def _reset_derived_times(target, *args):
+    """Reloaded datetimes may differ from the memoized ones."""
+    for name in _DERIVED_TIME_ATTRS:
+        target.__dict__.pop(name, None)
+
+
 class FlightPoint(db.Model):
     """Flight point model for storing GPS and flight data points."""
     
@@ -556,35 +687,58 @@ class Event(db.Model):
         'FlushAndLink': 31     # Flush and link operation
     }
     
+    # Event name -> bit mask, computed once for the bitfield helpers
+    _BIT_MASKS = {event_name: 1 << bit_position for event_name, bit_position in EVENT_BITS.items()}
+    _BIT_NAMES = {bit_position: event_name for event_name, bit_position in EVENT_BITS.items()}
+    
     def has_event_bit(self, bit_name: str) -> bool:
         """Check if a specific event bit is set."""
-        if bit_name not in self.EVENT_BITS:
-            return False
-        bit_position = self.EVENT_BITS[bit_name]
-        return (self.bitfield & (1 << bit_position)) != 0
+        mask = self._BIT_MASKS.get(bit_name)
+        return mask is not None and (self.bitfield & mask) != 0
     
     def get_active_events(self):
         """Get list of active event names based on bitfield."""
+        # Visit only the set bits, lowest first, by peeling off the lowest set bit each time
+        # Mask to 32 bits first: with FlushAndLink (bit 31) set, a signed 32-bit store reads back
+        # negative, and peeling bits off a negative int never reaches zero
         active_events = []
-        for event_name, bit_position in self.EVENT_BITS.items():
-            if (self.bitfield & (1 << bit_position)) != 0:
+        bitfield = (self.bitfield or 0) & 0xFFFFFFFF
+        while bitfield:
+            lowest_bit = bitfield & -bitfield
+            event_name = self._BIT_NAMES.get(lowest_bit.bit_length() - 1)
+            if event_name:
                 active_events.append(event_name)
+            bitfield ^= lowest_bit
         return active_events
     
     def set_event_bit(self, bit_name: str, value: bool = True):
         """Set or clear a specific event bit."""
-        if bit_name not in self.EVENT_BITS:
+        mask = self._BIT_MASKS.get(bit_name)
+        if mask is None:
             return
-        bit_position = self.EVENT_BITS[bit_name]
-        if value:
-            self.bitfield |= (1 << bit_position)
-        else:
-            self.bitfield &= ~(1 << bit_position)
+        self.bitfield = (self.bitfield & ~mask) | (mask if value else 0)
     
     @classmethod
-    def get_newest_event_for_device(cls, device_id: int):
-        """Get the newest event for a device based on highest page_address."""
-        return cls.query.filter_by(device_id=device_id).order_by(cls.page_address.desc()).first()
+    def get_newest_event_for_device(cls, device_id: int, *options):
+        """Get the newest event for a device based on highest page_address.
+
+        The device is joined in the same query; extra loader ``options`` are applied as well.
+        """
+        return cls.query.options(joinedload(cls.device), *options).filter_by(
+            device_id=device_id
+        ).order_by(cls.page_address.desc()).first()
+    
+    @classmethod
+    def count_by_event_type(cls, *criteria) -> Tuple[int, Dict[str, int]]:
+        """Count events matching ``criteria`` in total and per event bit, in one query."""
+        total, *counts = db.session.query(
+            db.func.count(cls.id),
+            *(
+                db.func.coalesce(db.func.sum(db.case((cls.bitfield.op('&')(mask) != 0, 1), else_=0)), 0)
+                for mask in cls._BIT_MASKS.values()
+            )
+        ).filter(*criteria).one()
+        return total, dict(zip(cls._BIT_MASKS, counts))
     
     def format_log_time(self):
         """Format total_time (milliseconds) as H:M:S string."""
@@ -6,6 +6,7 @@ import logging
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from functools import wraps
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, timedelta
 from src.app import db
 from src.models import User, Device, Checklist, LogbookEntry, Pilot, Event, FlightPoint, Airfield
@@ -60,7 +61,8 @@ def index():
 @admin_required
 def logbook():
     """Admin view of all logbook entries with device linking information."""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')  # keyset cursor of the previous page's last entry
+    before = request.args.get('before')  # keyset cursor of the next page's first entry
     per_page = 20
     
     # Get filter parameters
@@ -80,25 +82,30 @@ def logbook():
     if device_id:
         query = query.filter(LogbookEntry.device_id == device_id)
     
-    # Order by takeoff datetime descending
-    query = query.order_by(LogbookEntry.takeoff_datetime.desc(), LogbookEntry.created_at.desc())
+    # Count with a bare count(id) over the filters rather than wrapping the listing query
+    filtered_total = query.with_entities(db.func.count(LogbookEntry.id)).scalar()
     
-    # Paginate
-    entries = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Newest first; keyset pagination seeks past either cursor instead of using OFFSET.
+    # The template reads each entry's device and pilot, so load them for the whole page
+    entries = LogbookEntry.seek_page(query.options(
+        selectinload(LogbookEntry.device),
+        selectinload(LogbookEntry.user),
+        selectinload(LogbookEntry.pilot_mapping).joinedload(Pilot.user),
+    ), after, per_page, before=before)
     
     # Get devices for filter dropdown
     devices = Device.query.filter_by(is_active=True).order_by(Device.registration).all()
     
-    # Get statistics
-    total_entries = LogbookEntry.query.count()
-    synced_entries = LogbookEntry.query.filter(LogbookEntry.device_id.isnot(None)).count()
+    # Get statistics; count(device_id) skips NULLs, so one query counts both
+    total_entries, synced_entries = db.session.query(
+        db.func.count(LogbookEntry.id), db.func.count(LogbookEntry.device_id)
+    ).one()
     manual_entries = total_entries - synced_entries
     
     return render_template('admin/logbook.html',
                          title='Logbook Management',
                          entries=entries,
+                         filtered_total=filtered_total,
                          devices=devices,
                          show_synced=show_synced,
                          selected_device_id=device_id,
@@ -899,11 +906,7 @@ def events():
     devices = Device.query.filter_by(is_active=True).all()
     
     # Get event type counts for statistics
-    event_stats = {}
-    for event_name, bit_position in Event.EVENT_BITS.items():
-        bit_mask = 1 << bit_position
-        count = Event.query.filter(Event.bitfield.op('&')(bit_mask) != 0).count()
-        event_stats[event_name] = count
+    _, event_stats = Event.count_by_event_type()
     
     return render_template('admin/events.html',
                          title='Device Events',
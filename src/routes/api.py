@@ -2,6 +2,7 @@
 API routes for external server integration
 """
 
+import hmac
 import os
 from functools import wraps
 from flask import Blueprint, request, jsonify, current_app
@@ -36,7 +37,8 @@ def require_api_key(f):
                 'message': 'API key not configured on server'
             }), 500
         
-        if api_key != expected_api_key:
+        # Constant-time compare so response timing doesn't leak how much of the key matched
+        if not hmac.compare_digest(api_key.encode(), expected_api_key.encode()):
             return jsonify({
                 'error': 'Invalid API key',
                 'message': 'The provided API key is not valid'
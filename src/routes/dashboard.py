@@ -12,8 +12,9 @@ from PIL import Image
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from flask_wtf.csrf import validate_csrf
+from sqlalchemy.orm import selectinload
 from src.app import db
-from src.models import Device, Checklist, InstrumentLayout, ApproachChart, LogbookEntry, InitialLogbookTime, Pilot, Event, FlightPoint, Airfield
+from src.models import DEFAULT_CHECKLIST_JSON, Device, Checklist, InstrumentLayout, ApproachChart, LogbookEntry, InitialLogbookTime, Pilot, Event, FlightPoint, Airfield
 from src.forms import DeviceForm, ChecklistForm, ChecklistCreateForm, ChecklistImportForm, InstrumentLayoutForm, InstrumentLayoutCreateForm, InstrumentLayoutImportForm, LogbookEntryForm, InitialLogbookTimeForm, DevicePilotMappingForm
 from src.services.thingsboard_sync import ThingsBoardSyncService
 import json
@@ -431,7 +432,6 @@ def device_logbook(device_id):
     
     # If not the owner, check if user is mapped as a pilot for this device
     if not device:
-        from src.models import Pilot
         pilot_mapping = Pilot.query.filter_by(
             user_id=current_user.id, 
             device_id=device_id, 
@@ -451,7 +451,9 @@ def device_logbook(device_id):
     
     # Get ALL logbook entries linked to this device (regardless of user_id)
     # This includes entries from device events (user_id=None) and pilot mappings
+    # The template reads each entry's pilot mapping, so load them for the whole page
     entries = LogbookEntry.query.filter_by(device_id=device_id)\
+        .options(selectinload(LogbookEntry.pilot_mapping).joinedload(Pilot.user))\
         .order_by(LogbookEntry.takeoff_datetime.desc(), LogbookEntry.created_at.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
     
@@ -600,48 +602,11 @@ def add_checklist():
     """Add new checklist."""
     form = ChecklistCreateForm()
     if form.validate_on_submit():
-        # Default checklist template
-        default_template = {
-            "Language": "en-us",
-            "Voice": "Linda",
-            "Root": {
-                "Type": 0,
-                "Name": "Root",
-                "Children": [
-                    {
-                        "Type": 0,
-                        "Name": "Pre-flight",
-                        "Children": []
-                    },
-                    {
-                        "Type": 0,
-                        "Name": "In-flight",
-                        "Children": []
-                    },
-                    {
-                        "Type": 0,
-                        "Name": "Post-flight",
-                        "Children": []
-                    },
-                    {
-                        "Type": 0,
-                        "Name": "Emergency",
-                        "Children": []
-                    },
-                    {
-                        "Type": 0,
-                        "Name": "Reference",
-                        "Children": []
-                    }
-                ]
-            }
-        }
-        
         checklist = Checklist(
             title=form.title.data,
             description=form.description.data or "",
             items=json.dumps([]),  # Empty items for now
-            json_content=json.dumps(default_template),
+            json_content=DEFAULT_CHECKLIST_JSON,
             user_id=current_user.id
         )
         db.session.add(checklist)
@@ -667,9 +632,8 @@ def import_checklist():
             
             # Extract filename without extension for title
             filename = file.filename
-            if filename.lower().endswith('.ckl'):
-                title = filename[:-4]  # Remove .ckl extension
-            else:
+            title, extension = os.path.splitext(filename)
+            if extension.lower() != '.ckl':
                 title = filename
             
             # Create checklist with file content directly in json_content
@@ -988,7 +952,9 @@ def logbook():
         # No pilot mappings, just show directly assigned entries
         query = query.filter_by(user_id=current_user.id)
     
-    entries = query.order_by(LogbookEntry.takeoff_datetime.desc())\
+    # The template reads each entry's pilot user, so load the mappings for the whole page
+    entries = query.options(selectinload(LogbookEntry.pilot_mapping).joinedload(Pilot.user))\
+        .order_by(LogbookEntry.takeoff_datetime.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
     
     # Calculate totals using new function
@@ -1316,6 +1282,9 @@ def api_update_checklist(checklist_id):
     # If data is provided without explicit json_content, also update json_content
     elif 'data' in request_data:
         checklist.json_content = request_data['data']
+    # The editor posts the checklist as a JSON object; the column stores text
+    if checklist.json_content is not None and not isinstance(checklist.json_content, str):
+        checklist.json_content = json.dumps(checklist.json_content)
     
     checklist.updated_at = db.func.now()
     db.session.commit()
@@ -1997,15 +1966,9 @@ def events():
     # Calculate statistics
     stats = {}
     if device_ids:
-        stats['total_events'] = Event.query.filter(Event.device_id.in_(device_ids)).count()
-        
-        # Count events by type
-        for event_name, bit_position in Event.EVENT_BITS.items():
-            bit_mask = 1 << bit_position
-            count = Event.query.filter(
-                Event.device_id.in_(device_ids),
-                Event.bitfield.op('&')(bit_mask) != 0
-            ).count()
+        # Count events in total and by type in one query
+        stats['total_events'], type_counts = Event.count_by_event_type(Event.device_id.in_(device_ids))
+        for event_name, count in type_counts.items():
             stats[f'{event_name.lower()}_count'] = count
     else:
         stats = {'total_events': 0}
@@ -118,11 +118,12 @@ def api_get_statistics():
         total_notams = Notam.query.count()
         active_notams = len(notam_service.get_active_notams())
         
-        # Statistics by ICAO code
+        # Statistics by ICAO code (active NOTAMs for all areas in one query)
+        active_by_icao = notam_service.get_active_notams_for(notam_service.SUPPORTED_AREAS)
         icao_stats = {}
         for icao_code in notam_service.SUPPORTED_AREAS:
             total = Notam.query.filter_by(icao_code=icao_code).count()
-            active = len(notam_service.get_active_notams(icao_code))
+            active = len(active_by_icao[icao_code])
             icao_stats[icao_code] = {
                 'total': total,
                 'active': active
@@ -371,8 +371,8 @@ KanardiaCloud Team
         except Exception as e:
             logger.error(f"Error sending email to {user.email}: {str(e)}")
     
-    def get_active_notams(self, icao_code: str = None, check_date: datetime = None) -> List[Notam]:
-        """Get active NOTAMs for a specific area or all areas."""
+    def _active_notams_query(self, check_date: datetime = None):
+        """Build a query for NOTAMs that are active at the given date."""
         if check_date is None:
             check_date = datetime.now(timezone.utc)
         
@@ -382,13 +382,8 @@ KanardiaCloud Team
         else:
             check_date_naive = check_date
         
-        query = Notam.query
-        
-        if icao_code:
-            query = query.filter_by(icao_code=icao_code)
-        
         # Filter for active NOTAMs
-        query = query.filter(
+        return Notam.query.filter(
             db.or_(
                 # Permanent NOTAMs that have started
                 db.and_(
@@ -406,9 +401,34 @@ KanardiaCloud Team
                 )
             )
         )
+    
+    def get_active_notams(self, icao_code: str = None, check_date: datetime = None) -> List[Notam]:
+        """Get active NOTAMs for a specific area or all areas."""
+        query = self._active_notams_query(check_date)
+        
+        if icao_code:
+            query = query.filter_by(icao_code=icao_code)
         
         return query.order_by(Notam.valid_from.desc()).all()
     
+    def get_active_notams_for(self, icao_codes: List[str], check_date: datetime = None) -> Dict[str, List[Notam]]:
+        """Get active NOTAMs for several areas with a single query, grouped by ICAO code."""
+        notams_by_icao = {icao_code: [] for icao_code in icao_codes}
+        if not notams_by_icao:
+            return notams_by_icao
+        
+        notams = (
+            self._active_notams_query(check_date)
+            .filter(Notam.icao_code.in_(notams_by_icao))
+            .order_by(Notam.valid_from.desc())
+            .all()
+        )
+        
+        for notam in notams:
+            notams_by_icao[notam.icao_code].append(notam)
+        
+        return notams_by_icao
+    
     def cleanup_expired_notams(self, days_old: int = 30):
         """Remove NOTAMs that have been expired for more than specified days."""
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_old)
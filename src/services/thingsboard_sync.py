@@ -3,15 +3,19 @@ ThingsBoard sync service for logbook entries
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
 import os
 import base64
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta, time, timezone
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import Iterable, List, Dict, Any, Optional
 from src.app import db
-from src.models import Device, LogbookEntry, User, Pilot, Event
+from src.models import Device, LogbookEntry, User, Pilot, Event, FlightPoint
 from src.services.geocoding import get_geocoder
 from flask import current_app
 
@@ -19,9 +23,28 @@ from flask import current_app
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+
+def _create_http_session() -> requests.Session:
+    """Keep-alive session that retries transient ThingsBoard gateway errors."""
+    session = requests.Session()
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        ))
+    return session
+
+
+# Shared by all service instances so short-lived ones (per request) reuse open connections
+_http_session = _create_http_session()
+
 class ThingsBoardSyncService:
     """Service for syncing logbook entries from ThingsBoard server."""
     
+    # JWT tokens shared by all service instances, keyed by (base_url, username)
+    _token_cache: Dict[tuple, tuple] = {}
+    
     def __init__(self, event_batch_size: int = 500):
         self.base_url = os.getenv('THINGSBOARD_URL', 'https://aetos.kanardia.eu:8088')
         self.username = os.getenv('THINGSBOARD_USERNAME', 'tenant@thingsboard.local')
@@ -32,6 +55,20 @@ class ThingsBoardSyncService:
         self._token_expires_at = None
         self._last_auth_check = None
         self._last_auth_error = None
+        
+        # Keep-alive session so consecutive ThingsBoard calls reuse the TLS connection
+        self._session = _http_session
+    
+    def close(self) -> None:
+        """Close this instance's HTTP session; the shared one stays open for the other instances."""
+        if self._session is not _http_session:
+            self._session.close()
+    
+    def _clear_token(self) -> None:
+        """Forget this account's JWT token, here and in the cache shared with other instances."""
+        self._jwt_token = None
+        self._token_expires_at = None
+        self._token_cache.pop((self.base_url, self.username), None)
     
     def _authenticate(self) -> Optional[str]:
         """
@@ -45,6 +82,13 @@ class ThingsBoardSyncService:
             datetime.now() < self._token_expires_at):
             return self._jwt_token
         
+        # Reuse a token obtained by another service instance for the same account
+        cache_key = (self.base_url, self.username)
+        cached_token = self._token_cache.get(cache_key)
+        if cached_token and datetime.now() < cached_token[1]:
+            self._jwt_token, self._token_expires_at = cached_token
+            return self._jwt_token
+        
         auth_url = f"{self.base_url}/api/auth/login"
         
         payload = {
@@ -64,7 +108,7 @@ class ThingsBoardSyncService:
             self._last_auth_check = datetime.now()
             self._last_auth_error = None
             
-            response = requests.post(
+            response = self._session.post(
                 url=auth_url,
                 json=payload,
                 headers=headers,
@@ -85,6 +129,7 @@ class ThingsBoardSyncService:
             
             # Calculate token expiration (tokens usually expire in 1 hour, but we'll refresh every 45 minutes)
             self._token_expires_at = datetime.now() + timedelta(minutes=45)
+            self._token_cache[cache_key] = (self._jwt_token, self._token_expires_at)
             
             logger.info("Successfully authenticated with ThingsBoard")
             return self._jwt_token
@@ -92,22 +137,19 @@ class ThingsBoardSyncService:
         except requests.exceptions.RequestException as e:
             error_msg = f"HTTP error during ThingsBoard authentication: {str(e)}"
             logger.error(error_msg)
-            self._jwt_token = None
-            self._token_expires_at = None
+            self._clear_token()
             self._last_auth_error = error_msg
             return None
         except json.JSONDecodeError as e:
             error_msg = f"Invalid JSON response during ThingsBoard authentication: {str(e)}"
             logger.error(error_msg)
-            self._jwt_token = None
-            self._token_expires_at = None
+            self._clear_token()
             self._last_auth_error = error_msg
             return None
         except Exception as e:
             error_msg = f"Unexpected error during ThingsBoard authentication: {str(e)}"
             logger.error(error_msg)
-            self._jwt_token = None
-            self._token_expires_at = None
+            self._clear_token()
             self._last_auth_error = error_msg
             return None
     
@@ -169,6 +211,10 @@ class ThingsBoardSyncService:
             
             results['total_devices'] = len(devices)
             
+            # Probe every device's activity status up front, concurrently, instead
+            # of one round trip at a time inside sync_device_events
+            active_by_id = self._things_active_by_id([d.external_device_id for d in devices])
+            
             for device in devices:
                 try:
                     # Sync telemetry data
@@ -180,7 +226,9 @@ class ThingsBoardSyncService:
                     # device_result = self.sync_device(device)
                     
                     # Sync events
-                    events_result = self.sync_device_events(device)
+                    events_result = self.sync_device_events(
+                        device, is_active=active_by_id.get(device.external_device_id)
+                    )
                     
                     # Process existing flights for flight points (limit to 100 per sync)
                     flight_points_result = self.process_existing_flights_for_points(device, max_entries=100)
@@ -217,18 +265,19 @@ class ThingsBoardSyncService:
         
         return results
     
-    def _thing_is_device_active(self, device_id: str) -> bool:
+    def _thing_is_device_active(self, device_id: str, jwt_token: Optional[str] = None) -> bool:
         """
         Check if device is active in ThingsBoard using telemetry API.
         
         Args:
             device_id: External device ID in ThingsBoard
+            jwt_token: Token obtained by the caller; authenticates when not given
             
         Returns:
             True if device is active, False otherwise
         """
         # Authenticate and get JWT token
-        jwt_token = self._authenticate()
+        jwt_token = jwt_token or self._authenticate()
         if not jwt_token:
             logger.error("Failed to authenticate with ThingsBoard for device activity check")
             return False
@@ -246,7 +295,7 @@ class ThingsBoardSyncService:
         try:
             logger.debug(f"Checking device activity status for device {device_id}")
             
-            response = requests.get(
+            response = self._session.get(
                 url=url,
                 headers=headers,
                 # params=params,
@@ -281,6 +330,35 @@ class ThingsBoardSyncService:
             logger.error(f"Unexpected error checking device activity for {device_id}: {str(e)}")
             return False
     
+    def _things_active_by_id(self, device_ids: List[str], max_workers: int = 8) -> Dict[str, bool]:
+        """
+        Check several devices' activity status concurrently.
+        
+        ThingsBoard has no multi-device attributes endpoint, so the per-device
+        probes are fanned out over the shared keep-alive session.
+        
+        Args:
+            device_ids: External device IDs in ThingsBoard
+            max_workers: Number of concurrent probes (matches the session pool size)
+            
+        Returns:
+            Dict mapping each device ID to its active status
+        """
+        if not device_ids:
+            return {}
+        
+        # Authenticate once before the pool starts and hand the token to every worker,
+        # so no worker ever runs _authenticate() or touches the token cache
+        jwt_token = self._authenticate()
+        if not jwt_token:
+            logger.error("Failed to authenticate with ThingsBoard for device activity check")
+            return {device_id: False for device_id in device_ids}
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(device_ids))) as executor:
+            return dict(zip(device_ids, executor.map(
+                lambda device_id: self._thing_is_device_active(device_id, jwt_token), device_ids
+            )))
+    
     def _get_device_telemetry(self, device_id: str) -> Optional[Dict[str, Any]]:
         """
         Get latest telemetry data for a device from ThingsBoard.
@@ -311,7 +389,7 @@ class ThingsBoardSyncService:
         try:
             logger.debug(f"Requesting telemetry data for device {device_id}")
             
-            response = requests.get(
+            response = self._session.get(
                 url=url,
                 headers=headers,
                 timeout=self.timeout
@@ -392,8 +470,10 @@ class ThingsBoardSyncService:
                 logger.debug(f"No telemetry data available for device {device.name}")
                 return False
             
-            # Update device with telemetry data
-            device.update_telemetry(telemetry_data)
+            # Update device with telemetry data; the geocoding lookup inside
+            # must not flush the half-updated device
+            with db.session.no_autoflush:
+                device.update_telemetry(telemetry_data)
             
             # Commit changes
             db.session.commit()
@@ -474,7 +554,7 @@ class ThingsBoardSyncService:
         try:
             logger.debug(f"Calling ThingsBoard RPC getFlight for device {device_id} with {len(events_data)} events")
             
-            response = requests.post(
+            response = self._session.post(
                 url=url,
                 json=payload,
                 headers=headers,
@@ -511,10 +591,10 @@ class ThingsBoardSyncService:
         except requests.exceptions.RequestException as e:
             logger.error(f"HTTP error calling ThingsBoard getFlight API for device {device_id}: {str(e)}")
             # If we get an authentication error, clear the token and try once more
-            if hasattr(e, 'response') and e.response and e.response.status_code in [401, 403]:
+            # A Response is falsy for error statuses, so compare with None
+            if getattr(e, 'response', None) is not None and e.response.status_code in [401, 403]:
                 logger.info("Authentication failed, clearing token and retrying...")
-                self._jwt_token = None
-                self._token_expires_at = None
+                self._clear_token()
                 # Could implement one retry here, but for now just return None
             return None
         except json.JSONDecodeError as e:
@@ -535,6 +615,41 @@ class ThingsBoardSyncService:
         Returns:
             True if new entry was created, False if it already exists
         """
+        logbook_entry = self._build_logbook_entry(device, entry_data)
+        
+        # Check if entry already exists (avoid duplicates)
+        # For synced entries, check by device, takeoff/landing datetime
+        existing_entry = LogbookEntry.query.filter_by(
+            device_id=device.id,
+            takeoff_datetime=logbook_entry.takeoff_datetime,
+            landing_datetime=logbook_entry.landing_datetime
+        ).first()
+        
+        if existing_entry:
+            logger.debug(f"Logbook entry already exists for device {device.name} on {logbook_entry.date}")
+            return False
+        
+        db.session.add(logbook_entry)
+        
+        logger.debug(f"Created new logbook entry for device {device.name} ({logbook_entry.aircraft_registration}) "
+                    f"on {logbook_entry.date}"
+                    f"{f' for pilot {logbook_entry.pilot_name}' if logbook_entry.pilot_name else ''}")
+        return True
+    
+    def _build_logbook_entry(self, device: Device, entry_data: Dict[str, Any],
+                             pilot_user_ids: Optional[Dict[str, int]] = None) -> LogbookEntry:
+        """
+        Build an unsaved logbook entry from ThingsBoard data.
+        
+        Args:
+            device: Device model instance
+            entry_data: Dictionary with logbook entry data from ThingsBoard
+            pilot_user_ids: Preloaded pilot name -> user ID mappings for the device;
+                looked up per entry when not given
+            
+        Returns:
+            New LogbookEntry, not yet added to the session
+        """
         try:
             # Extract required fields with validation
             date_str = entry_data.get('date')
@@ -603,24 +718,14 @@ class ThingsBoardSyncService:
                 flight_duration = landing_datetime - takeoff_datetime
                 flight_time = round(flight_duration.total_seconds() / 3600, 2)
             
-            # Check if entry already exists (avoid duplicates)
-            # For synced entries, check by device, takeoff/landing datetime
-            existing_entry = LogbookEntry.query.filter_by(
-                device_id=device.id,
-                takeoff_datetime=takeoff_datetime,
-                landing_datetime=landing_datetime
-            ).first()
-            
-            if existing_entry:
-                logger.debug(f"Logbook entry already exists for device {device.name} on {entry_date}")
-                return False
-            
-            # Create new logbook entry
             # Determine user_id: use pilot mapping if available, otherwise device owner
             # But only if no pilot name is specified or pilot is mapped
             pilot_user_id = None
             if pilot_name:
-                pilot_user_id = self._resolve_pilot_user(device, pilot_name)
+                if pilot_user_ids is not None:
+                    pilot_user_id = pilot_user_ids.get(pilot_name)
+                else:
+                    pilot_user_id = self._resolve_pilot_user(device, pilot_name)
             
             # Set user_id based on pilot resolution
             if pilot_name and pilot_user_id is None:
@@ -633,7 +738,7 @@ class ThingsBoardSyncService:
                 # No pilot name specified - assign to device owner
                 entry_user_id = device.user_id
             
-            logbook_entry = LogbookEntry(
+            return LogbookEntry(
                 takeoff_datetime=takeoff_datetime,
                 landing_datetime=landing_datetime,
                 aircraft_type=aircraft_type,
@@ -654,12 +759,6 @@ class ThingsBoardSyncService:
                 device_id=device.id  # Link to the syncing device
             )
             
-            db.session.add(logbook_entry)
-            
-            logger.debug(f"Created new logbook entry for device {device.name} ({aircraft_registration}) on {entry_date}"
-                        f"{f' for pilot {pilot_name}' if pilot_name else ''}")
-            return True
-            
         except (ValueError, TypeError, KeyError) as e:
             logger.error(f"Invalid logbook entry data: {str(e)}")
             logger.debug(f"Entry data: {entry_data}")
@@ -778,12 +877,13 @@ class ThingsBoardSyncService:
             logger.error(f"Error resolving pilot user for '{pilot_name}': {str(e)}")
             return None  # Do not fall back to device owner
 
-    def sync_device_events(self, device: Device) -> Dict[str, Any]:
+    def sync_device_events(self, device: Device, is_active: Optional[bool] = None) -> Dict[str, Any]:
         """
         Sync events for a specific device.
         
         Args:
             device: Device model instance with external_device_id
+            is_active: Activity status if already known; probed in ThingsBoard when None
             
         Returns:
             Dict with sync results for device events
@@ -798,7 +898,9 @@ class ThingsBoardSyncService:
         
         try:
             # First check if device is active in ThingsBoard
-            if not self._thing_is_device_active(device.external_device_id):
+            if is_active is None:
+                is_active = self._thing_is_device_active(device.external_device_id)
+            if not is_active:
                 logger.info(f"Device {device.name} is not active in ThingsBoard, skipping events RPC call")
                 return None
         
@@ -823,17 +925,21 @@ class ThingsBoardSyncService:
 
                     write_page = events_data.get('write_page', 0)
 
-                    # Process initial events from syncLog call
-                    initial_events = events_data.get('events', [])
+                    # Process initial events from syncLog call; popped so events_data
+                    # does not keep the batch alive while the remaining ones are pumped
+                    initial_count = 0
+                    initial_events = events_data.pop('events', [])
                     if initial_events:
                         batch_result = self._process_events(device, initial_events, write_page)
                         result['new_events'] += batch_result['new_events']
                         result['errors'].extend(batch_result['errors'])
-                        total_events_processed += len(initial_events)
+                        initial_count = batch_result['total_events']
+                        total_events_processed += initial_count
+                    del initial_events
                     
                     # Check if there are remaining events to fetch
                     remaining = int(events_data.get('remaining', '0'))
-                    logger.debug(f"Initial syncLog call for device {device.name}: {len(initial_events)} events processed, {remaining} remaining")
+                    logger.debug(f"Initial syncLog call for device {device.name}: {initial_count} events processed, {remaining} remaining")
                     
                     # If there are remaining events, pump them with getEvents calls
                     pump_iteration = 0
@@ -854,16 +960,20 @@ class ThingsBoardSyncService:
                                 device.updated_at = datetime.now(timezone.utc)
 
                             write_page = additional_data.get('write_page', 0)
-                            additional_events = additional_data.get('events', [])
+                            remaining = int(additional_data.get('remaining', '0'))
+                            additional_count = 0
+                            additional_events = additional_data.pop('events', [])
                             if additional_events:
                                 # Process this batch immediately
                                 batch_result = self._process_events(device, additional_events, write_page)
                                 result['new_events'] += batch_result['new_events']
                                 result['errors'].extend(batch_result['errors'])
-                                total_events_processed += len(additional_events)
+                                additional_count = batch_result['total_events']
+                                total_events_processed += additional_count
+                            # Release the batch before the next call fetches another one
+                            del additional_events
                             
-                            remaining = int(additional_data.get('remaining', '0'))
-                            logger.debug(f"Iteration {pump_iteration}: processed {len(additional_events)} events, {remaining} still remaining")
+                            logger.debug(f"Iteration {pump_iteration}: processed {additional_count} events, {remaining} still remaining")
                             
                         else:
                             logger.warning(f"Unexpected data format from getEvents API for device {device.name} on iteration {pump_iteration}")
@@ -956,7 +1066,7 @@ class ThingsBoardSyncService:
         try:
             logger.debug(f"Calling ThingsBoard {method} API for device {device_id}"
                         f"{f' with params {payload}' if payload else ''}")
-            response = requests.post(
+            response = self._session.post(
                 url=url,
                 json=payload,
                 headers=headers,
@@ -970,11 +1080,9 @@ class ThingsBoardSyncService:
             # If the response is a dict with a single key 'data', and the value is a string, try to decompress it
             if isinstance(data, dict) and 'data' in data and isinstance(data['data'], str):
                 try:
-                    compressed = base64.b64decode(data['data'])
-                    # qCompress adds a 4-byte Qt header, skip it
-                    decompressed = zlib.decompress(compressed[4:])
-                    # Try to decode as utf-8 and parse as JSON
-                    data = json.loads(decompressed.decode('utf-8'))
+                    # qCompress adds a 4-byte Qt header, skip it; json.loads takes the
+                    # UTF-8 bytes directly, so no decoded copy of the payload is made
+                    data = json.loads(zlib.decompress(base64.b64decode(data['data'])[4:]))
                     logger.debug(f"Decompressed and loaded JSON data for device {device_id}")
                 except Exception as e:
                     logger.error(f"Failed to decompress or decode ThingsBoard {method} data for device {device_id}: {str(e)}")
@@ -996,16 +1104,40 @@ class ThingsBoardSyncService:
             logger.error(f"Unexpected error calling ThingsBoard {method} API for device {device_id}: {str(e)}")
             return None
 
-    def _process_device_event(self, device: Device, event_data: Dict[str, Any]) -> bool:
+    def _existing_event_pages(self, device_id: int, page_addresses: List[int]) -> set:
+        """
+        Get the page addresses from page_addresses already stored as events for a device.
+        
+        Args:
+            device_id: Device ID
+            page_addresses: Page addresses to look up
+            
+        Returns:
+            Set of page addresses that already have an event
+        """
+        page_addresses = [page for page in page_addresses if page is not None]
+        if not page_addresses:
+            return set()
+        
+        rows = db.session.query(Event.page_address).filter(
+            Event.device_id == device_id,
+            Event.page_address.in_(page_addresses)
+        )
+        return {page_address for page_address, in rows}
+    
+    def _process_device_event(self, device: Device, event_data: Dict[str, Any],
+                              existing_pages: Optional[set] = None) -> Optional[Event]:
         """
         Process a single device event from ThingsBoard.
         
         Args:
             device: Device instance
             event_data: Event data dictionary from ThingsBoard
+            existing_pages: Pages already stored for the device (see _existing_event_pages);
+                            checked instead of querying, and updated with the new page
             
         Returns:
-            True if new event was created, False if it already exists
+            The new Event if one was created, None if it already exists or was skipped
         """
         try:
             # Extract event fields
@@ -1019,11 +1151,11 @@ class ThingsBoardSyncService:
             # Validate required fields (non-nullable)
             if page_address is None:
                 logger.warning(f"Skipping event for device {device.name}: page_address is required")
-                return False
+                return None
             
             if total_time is None:
                 logger.warning(f"Skipping event for device {device.name}: total_time is required")
-                return False
+                return None
             
             # Parse date_time if provided
             event_datetime = None
@@ -1040,14 +1172,17 @@ class ThingsBoardSyncService:
                     logger.warning(f"Could not parse date_time '{date_time_str}' for device {device.name}: {str(e)}")
             
             # Check if event already exists (by page_address and device)
-            existing_event = Event.query.filter_by(
-                device_id=device.id,
-                page_address=page_address
-            ).first()
+            if existing_pages is not None:
+                existing_event = page_address in existing_pages
+            else:
+                existing_event = Event.query.filter_by(
+                    device_id=device.id,
+                    page_address=page_address
+                ).first()
             
             if existing_event:
                 logger.debug(f"Event already exists for device {device.name} at page {page_address}")
-                return False
+                return None
             
             # Create new event
             event = Event(
@@ -1061,17 +1196,19 @@ class ThingsBoardSyncService:
             )
             
             db.session.add(event)
+            if existing_pages is not None:
+                existing_pages.add(page_address)
            
             # Log the event creation with active event types
             active_events = event.get_active_events()
             events_str = ', '.join(active_events) if active_events else 'None'
             logger.debug(f"Created event for device {device.name}: page={page_address}, events=[{events_str}]")
             
-            return True
+            return event
             
         except Exception as e:
             logger.error(f"Error processing event for device {device.name}: {str(e)}")
-            return False
+            return None
     
     def _rebuild_complete_logbook_from_events(self, device: Device) -> Dict[str, Any]:
         """
@@ -1093,18 +1230,14 @@ class ThingsBoardSyncService:
         
         try:
             # Step 1: Clear existing event-generated logbook entries for this device
-            # We identify event-generated entries by checking if they have a device_id and
-            # contain specific text in remarks indicating they were generated from events
-            existing_event_entries = LogbookEntry.query.filter(
-                LogbookEntry.device_id == device.id
-            ).all()
-            
-            logger.debug(f"Found {len(existing_event_entries)} existing event-generated logbook entries for device {device.name}")
-            
-            # Remove existing event-generated entries
-            for entry in existing_event_entries:
-                db.session.delete(entry)
-                result['removed_entries'] += 1
+            # Set-based statements instead of loading and deleting each entry: unlink
+            # the entries' events and drop their flight points, then delete the entries
+            entry_ids = db.select(LogbookEntry.id).where(LogbookEntry.device_id == device.id)
+            Event.query.filter(Event.logbook_entry_id.in_(entry_ids)).update(
+                {Event.logbook_entry_id: None}, synchronize_session='fetch')
+            FlightPoint.query.filter(FlightPoint.logbook_entry_id.in_(entry_ids)).delete(
+                synchronize_session='fetch')
+            result['removed_entries'] = LogbookEntry.query.filter_by(device_id=device.id).delete()
             
             if result['removed_entries'] > 0:
                 logger.info(f"Removed {result['removed_entries']} existing event-generated logbook entries for device {device.name}")
@@ -1648,6 +1781,7 @@ class ThingsBoardSyncService:
                 landings_night=0,
                 remarks=remarks,
                 pilot_name=pilot_name,
+                is_event_generated=True,
                 user_id=None,
                 device_id=device.id
             )
@@ -1797,9 +1931,7 @@ class ThingsBoardSyncService:
             logger.info(f"Cleared {result['events_cleared']} events from database")
             
             # Clear all event-generated logbook entries
-            event_entries = LogbookEntry.query.filter(
-                LogbookEntry.remarks.like('%Generated from device events%')
-            ).all()
+            event_entries = LogbookEntry.query.filter(LogbookEntry.is_event_generated).all()
             
             for entry in event_entries:
                 db.session.delete(entry)
@@ -1876,7 +2008,7 @@ class ThingsBoardSyncService:
         try:
             logger.info(f"Sending checklist to device {device_id} via ThingsBoard RPC")
             
-            response = requests.post(
+            response = self._session.post(
                 url=url,
                 json=payload,
                 headers=headers,
@@ -1902,39 +2034,48 @@ class ThingsBoardSyncService:
             logger.error(f"Unexpected error sending checklist to device {device_id}: {e}")
             return False
 
-    def _process_events(self, device: Device, events: List[Dict[str, Any]], write_page: int) -> Dict[str, Any]:
+    def _process_events(self, device: Device, events: Iterable[Dict[str, Any]], write_page: int) -> Dict[str, Any]:
         """
-        Process a list of events for better performance and memory management.
+        Process a batch of events for better performance and memory management.
         
         Args:
             device: Device instance
-            events: List of event dictionaries from ThingsBoard
+            events: Event dictionaries from ThingsBoard; any iterable, consumed once
             
         Returns:
             Dict with processing results including new events count and errors
         """
         result = {
-            'total_events': len(events),
+            'total_events': 0,
             'new_events': 0,
             'errors': []
         }
         
-        if not events:
-            logger.debug(f"No events to process for device {device.name}")
-            return result
+        logger.info(f"Processing events for device {device.name}")
         
-        logger.info(f"Processing {len(events)} events for device {device.name}")
+        # Work through the events in chunks of event_batch_size so duplicates are
+        # found with one query per chunk instead of one per event
+        events = iter(events)
+        while True:
+            chunk = list(islice(events, self.event_batch_size))
+            if not chunk:
+                break
+            existing_pages = self._existing_event_pages(device.id, [event.get('page') for event in chunk])
+            
+            for event in chunk:
+                result['total_events'] += 1
+                try:
+                    event['write_page'] = write_page
+                    if self._process_device_event(device, event, existing_pages):
+                        result['new_events'] += 1
+                except Exception as e:
+                    error_msg = f"Failed to process event {result['total_events']} for device {device.name}: {str(e)}"
+                    logger.error(error_msg)
+                    result['errors'].append(error_msg)
         
-        # Process all events at once
-        for event_idx, event in enumerate(events):
-            try:
-                event['write_page'] = write_page
-                if self._process_device_event(device, event):
-                    result['new_events'] += 1
-            except Exception as e:
-                error_msg = f"Failed to process event {event_idx + 1} for device {device.name}: {str(e)}"
-                logger.error(error_msg)
-                result['errors'].append(error_msg)
+        if not result['total_events']:
+            logger.debug(f"No events to process for device {device.name}")
+            return result
         
         # Commit all changes to database at once
         try:
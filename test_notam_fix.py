@@ -20,12 +20,13 @@ def test_notam_retrieval():
     with app.app_context():
         print("Testing NOTAM retrieval...")
         
-        # Test with current date
-        today = datetime.now(timezone.utc).date()
+        # Test with current date; one UTC instant is used for every validity check
+        now = datetime.now(timezone.utc)
+        today = now.date()
         print(f"Checking NOTAMs for: {today}")
         
         # Get all active NOTAMs
-        notams = notam_service.get_active_notams()
+        notams = notam_service.get_active_notams(check_date=now)
         print(f"Total active NOTAMs: {len(notams)}")
         
         if notams:
@@ -38,10 +39,11 @@ def test_notam_retrieval():
             print(f"  Is permanent: {notam.is_permanent}")
             print(f"  Body: {notam.body[:100]}..." if notam.body else "  Body: None")
         
-        # Test with specific ICAO codes
+        # Test with specific ICAO codes, fetched together in one query
         test_codes = ['LJLA', 'LJLJ', 'LJLY']
+        notams_by_icao = notam_service.get_active_notams_for(test_codes, check_date=now)
         for icao_code in test_codes:
-            code_notams = notam_service.get_active_notams(icao_code)
+            code_notams = notams_by_icao[icao_code]
             print(f"\nActive NOTAMs for {icao_code}: {len(code_notams)}")
             
         return True
@@ -3,121 +3,114 @@
 Test script for the KanardiaCloud External API
 """
 
-import requests
 import json
+import os
 import sys
 
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tests.conftest import make_device
+
 # Configuration
-BASE_URL = "http://localhost:5000/api/external"
+BASE_URL = "/api/external"
 API_KEY = "kanardia-external-api-key-2025-change-in-production"
+TEST_DEVICE_ID = "test_device_001"
 
-headers = {
+# Request bodies are identical on every run, so build them once; claims add the user's email
+TEST_CLAIM_PAYLOAD = {
+    "device_name": "Test Aircraft N123AB",
+    "device_id": TEST_DEVICE_ID,
+    "device_type": "aircraft",
+    "model": "Cessna 172",
+    "registration": "N123AB"
+}
+TEST_UNCLAIM_PAYLOAD = {
+    "device_id": TEST_DEVICE_ID
+}
+INVALID_CLAIM_PAYLOAD = {
+    "user_email": "test@example.com",
+    "device_name": "Test Device",
+    "device_id": "test_device_invalid"
+}
+INVALID_HEADERS = {
     "Content-Type": "application/json",
-    "X-API-Key": API_KEY
+    "X-API-Key": "invalid-key"
 }
 
-def test_health_check():
+def api_headers(client):
+    """Headers carrying the API key the in-process app expects."""
+    return {
+        "Content-Type": "application/json",
+        "X-API-Key": (client.application.config.get("EXTERNAL_API_KEY") or
+                      os.environ.get("EXTERNAL_API_KEY") or API_KEY)
+    }
+
+def test_health_check(client):
     """Test the health check endpoint."""
     print("Testing health check...")
-    response = requests.get(f"{BASE_URL}/health")
+    response = client.get(f"{BASE_URL}/health")
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response.get_json()}")
     print()
 
-def test_claim_device():
+def test_claim_device(client, user):
     """Test claiming a device."""
     print("Testing device claim...")
     
-    payload = {
-        "user_email": "test@example.com",  # Replace with actual user email
-        "device_name": "Test Aircraft N123AB",
-        "device_id": "test_device_001",
-        "device_type": "aircraft",
-        "model": "Cessna 172",
-        "registration": "N123AB"
-    }
-    
-    response = requests.post(f"{BASE_URL}/claim-device", json=payload, headers=headers)
+    payload = {**TEST_CLAIM_PAYLOAD, "user_email": user.email}
+    response = client.post(f"{BASE_URL}/claim-device", json=payload, headers=api_headers(client))
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response.get_json()}")
     print()
     
     return response.status_code == 201
 
-def test_device_status():
+def test_device_status(client, db_session, user):
     """Test checking device status."""
     print("Testing device status check...")
     
-    device_id = "test_device_001"
-    response = requests.get(f"{BASE_URL}/device-status/{device_id}", headers=headers)
+    # Status is looked up by serial number
+    make_device(db_session, user, serial_number=TEST_DEVICE_ID)
+    
+    response = client.get(f"{BASE_URL}/device-status/{TEST_DEVICE_ID}", headers=api_headers(client))
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response.get_json()}")
     print()
+    
+    return response.status_code == 200
 
-def test_unclaim_device():
+def test_unclaim_device(client, db_session, user):
     """Test unclaiming a device."""
     print("Testing device unclaim...")
     
-    payload = {
-        "device_id": "test_device_001"
-    }
+    # Devices are unclaimed by serial number
+    make_device(db_session, user, serial_number=TEST_DEVICE_ID)
     
-    response = requests.post(f"{BASE_URL}/unclaim-device", json=payload, headers=headers)
+    response = client.post(f"{BASE_URL}/unclaim-device", json=TEST_UNCLAIM_PAYLOAD, headers=api_headers(client))
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response.get_json()}")
     print()
+    
+    return response.status_code == 200
 
-def test_invalid_api_key():
+def test_invalid_api_key(client):
     """Test with invalid API key."""
     print("Testing invalid API key...")
     
-    invalid_headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": "invalid-key"
-    }
-    
-    payload = {
-        "user_email": "test@example.com",
-        "device_name": "Test Device",
-        "device_id": "test_device_invalid"
-    }
-    
-    response = requests.post(f"{BASE_URL}/claim-device", json=payload, headers=invalid_headers)
+    response = client.post(f"{BASE_URL}/claim-device", json=INVALID_CLAIM_PAYLOAD, headers=INVALID_HEADERS)
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response.get_json()}")
     print()
 
-def main():
-    """Run all tests."""
-    print("KanardiaCloud External API Test Suite")
-    print("=" * 40)
+def test_near_miss_api_key(client):
+    """Test with an API key that differs only in its last character."""
+    print("Testing near-miss API key...")
     
-    try:
-        # Test health check (no auth required)
-        test_health_check()
-        
-        # Test invalid API key
-        test_invalid_api_key()
-        
-        # Test claiming a device
-        claim_success = test_claim_device()
-        
-        if claim_success:
-            # Test device status
-            test_device_status()
-            
-            # Test unclaiming device
-            test_unclaim_device()
-        
-        print("All tests completed!")
-        
-    except requests.exceptions.ConnectionError:
-        print("Error: Could not connect to the API server.")
-        print("Make sure the KanardiaCloud application is running on http://localhost:5000")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error running tests: {e}")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    main()
+    api_key = api_headers(client)["X-API-Key"]
+    near_miss_key = api_key[:-1] + ("x" if api_key[-1] != "x" else "y")
+    
+    response = client.post(f"{BASE_URL}/claim-device", json=INVALID_CLAIM_PAYLOAD, headers={"X-API-Key": near_miss_key})
+    print(f"Status: {response.status_code}")
+    print(f"Response: {response.get_json()}")
+    print()
@@ -7,12 +7,12 @@ import os
 import sys
 from dotenv import load_dotenv
 
-# Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from services.thingsboard_sync import ThingsBoardSyncService
+from src.services.thingsboard_sync import ThingsBoardSyncService
 
-def test_auth_status():
+def test_auth_status(tb_sync):
     """Test the authentication status values."""
     # Load environment variables
     load_dotenv()
@@ -20,8 +20,8 @@ def test_auth_status():
     print("ThingsBoard Authentication Status Test")
     print("=" * 45)
     
-    # Initialize the sync service
-    sync_service = ThingsBoardSyncService()
+    # Shared sync service; under pytest it has already logged in once for the session
+    sync_service = tb_sync
     
     print("1. Testing initial authentication status...")
     auth_status = sync_service.get_authentication_status()
@@ -78,5 +78,5 @@ def test_auth_status():
     return success
 
 if __name__ == "__main__":
-    success = test_auth_status()
+    success = test_auth_status(ThingsBoardSyncService())
     sys.exit(0 if success else 1)
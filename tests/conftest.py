@@ -1,6 +1,272 @@
 # pytest configuration for KanardiaCloud tests
 import sys
 import os
+import re
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# JSON helpers for the tests; orjson works on UTF-8 bytes and its
+# JSONDecodeError subclasses json's, so `except json.JSONDecodeError` still applies
+from orjson import dumps as json_dumps, loads as json_loads
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+
+def pytest_configure(config):
+    """Run the suite against a private in-memory database unless TEST_DATABASE_URL says otherwise.
+
+    Set here rather than at import time, so scripts that only borrow the helpers below
+    keep the configured database. It runs before test modules are collected, so before
+    anything imports src.app, and .env files never override it. Flask-SQLAlchemy serves
+    an in-memory SQLite database through a single StaticPool connection, so the schema
+    is created once and shared by every test.
+    """
+    os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
+
+
+@contextmanager
+def transactional_session(app):
+    """Bind db.session to one outer transaction that is rolled back on exit.
+
+    Commits made by the code under test only release savepoints, so nothing
+    reaches the database file.
+    """
+    from src.models import db
+
+    with app.app_context():
+        connection = db.engine.connect()
+        trans = connection.begin()
+        dbapi_connection = connection.connection.driver_connection
+        if connection.dialect.name == 'sqlite':
+            # pysqlite defers BEGIN until the first DML statement, which would
+            # let a released savepoint commit; take control of BEGIN ourselves
+            isolation_level = dbapi_connection.isolation_level
+            dbapi_connection.isolation_level = None
+            connection.exec_driver_sql('BEGIN')
+
+        original_session = db.session
+        db.session = scoped_session(sessionmaker(
+            bind=connection, join_transaction_mode='create_savepoint'
+        ))
+        try:
+            yield db.session
+        finally:
+            db.session.remove()
+            db.session = original_session
+            trans.rollback()
+            if connection.dialect.name == 'sqlite':
+                dbapi_connection.isolation_level = isolation_level
+            connection.close()
+
+
+@contextmanager
+def count_queries(connection):
+    """Collect the SQL statements executed on ``connection`` inside the block."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(connection, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, 'before_cursor_execute', _record)
+
+
+def make_user(session, **fields):
+    """Add an active, verified test user with fixed values."""
+    from src.models import User
+
+    user = User(**{
+        'email': 'fixture.pilot@example.com',
+        'nickname': 'Fixture Pilot',
+        'password_hash': 'not-a-real-hash',
+        'is_active': True,
+        'is_verified': True,
+        **fields,
+    })
+    session.add(user)
+    session.flush()
+    return user
+
+
+def make_device(session, owner, **fields):
+    """Add a test aircraft owned by ``owner``."""
+    from src.models import Device
+
+    device = Device(**{
+        'name': 'Fixture Aircraft',
+        'device_type': 'aircraft',
+        'model': 'Fixture Model',
+        'serial_number': 'FIXTURE-001',
+        'registration': 'S5-FIX',
+        'user_id': owner.id,
+        **fields,
+    })
+    session.add(device)
+    session.flush()
+    return device
+
+
+def make_logbook_entry(session, device, **fields):
+    """Add a one-hour synced logbook entry for ``device``."""
+    from src.models import LogbookEntry
+
+    takeoff = datetime(2025, 1, 1, 10, 0)
+    entry = LogbookEntry(**{
+        'takeoff_datetime': takeoff,
+        'landing_datetime': takeoff + timedelta(hours=1),
+        'aircraft_type': device.model,
+        'aircraft_registration': device.registration,
+        'departure_airport': 'LJLJ',
+        'arrival_airport': 'LJMB',
+        'flight_time': 1.0,
+        'device_id': device.id,
+        'user_id': device.user_id,
+        **fields,
+    })
+    session.add(entry)
+    session.flush()
+    return entry
+
+
+def make_flight_events(session, device):
+    """Add the events of one engine run with a one-hour flight on ``device``."""
+    from src.models import Event
+
+    start = datetime(2025, 1, 1, 10, 0)
+    # (minutes after engine start, event bits)
+    timeline = (
+        (0, 0b00100001),   # AnyEngStart + EngRun1
+        (5, 0b00110010),   # Takeoff + Flying + EngRun1
+        (65, 0b00100100),  # Landing + EngRun1
+        (70, 0b00001000),  # LastEngStop
+    )
+    events = [
+        Event(
+            date_time=start + timedelta(minutes=minutes),
+            page_address=100 + page,
+            total_time=minutes * 60000,
+            bitfield=bits,
+            device_id=device.id,
+        )
+        for page, (minutes, bits) in enumerate(timeline)
+    ]
+    session.add_all(events)
+    session.flush()
+    return events
+
+
+# Compiled once and matched on the raw response bytes, so pages are never decoded
+_CSRF_INPUT_RE = re.compile(rb'name="csrf_token"[^>]*value="([^"]+)"')
+
+# Login form CSRF token per test client; a token stays valid for the client's session
+_csrf_tokens = weakref.WeakKeyDictionary()
+
+
+def get_csrf_token(client):
+    """Return a CSRF token for ``client``'s session, scraping the login form only once."""
+    token = _csrf_tokens.get(client)
+    if token is None:
+        page = client.get('/auth/login')
+        match = _CSRF_INPUT_RE.search(page.data) if page.status_code == 200 else None
+        if match:
+            token = _csrf_tokens[client] = match.group(1).decode()
+    return token
+
+
+@pytest.fixture(scope='session')
+def app():
+    """One application (and one create_all) for the whole test session.
+
+    create_app() builds a new application on every call, so tests take this
+    fixture (or ``client``) rather than calling the factory themselves.
+    """
+    from jinja2 import FileSystemBytecodeCache
+    from sqlalchemy import event
+    from src.app import create_app
+    from src.models import db
+    from src.services.scheduler import task_scheduler
+
+    app = create_app()
+
+    # No background jobs during tests: they would share the test's connection
+    task_scheduler.shutdown()
+
+    # Keep compiled templates in the user's temp dir, so later runs skip Jinja compilation;
+    # entries are invalidated when a template file changes
+    app.jinja_env.auto_reload = False
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+    with app.app_context():
+        in_memory = db.engine.url.database in (None, '', ':memory:')
+        if db.engine.dialect.name == 'sqlite' and not in_memory:
+            # Test-only: skip the rollback journal file and fsyncs on commit
+            @event.listens_for(db.engine, 'connect')
+            def _fast_sqlite(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute('PRAGMA journal_mode=MEMORY')
+                cursor.execute('PRAGMA synchronous=OFF')
+                cursor.close()
+
+            # Drop connections opened during create_app so every one gets the pragmas
+            db.engine.dispose()
+    return app
+
+
+@pytest.fixture(scope='session')
+def tb_sync():
+    """The app's shared ThingsBoard sync service, logged in once for the whole test session."""
+    from src.services.thingsboard_sync import thingsboard_sync
+    authenticated = thingsboard_sync.test_authentication()
+
+    # Later checks in the session reuse this login result instead of another round trip
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(thingsboard_sync, 'test_authentication', lambda: authenticated)
+        yield thingsboard_sync
+
+
+@pytest.fixture
+def app_ctx(app):
+    """Application context on the shared app, for read-only tests."""
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db_session(app):
+    """Per-test session whose changes are rolled back afterwards."""
+    with transactional_session(app) as session:
+        yield session
+
+
+@pytest.fixture
+def client(app, db_session):
+    """In-process test client whose database writes are rolled back."""
+    return app.test_client()
+
+
+@pytest.fixture
+def user(db_session):
+    """Known test user, rolled back with the test."""
+    return make_user(db_session)
+
+
+@pytest.fixture
+def device(db_session, user):
+    """Known test device owned by the ``user`` fixture."""
+    return make_device(db_session, user)
+
+
+@pytest.fixture
+def logbook_entry(db_session, device):
+    """Known synced logbook entry on the ``device`` fixture."""
+    return make_logbook_entry(db_session, device)
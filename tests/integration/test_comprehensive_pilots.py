@@ -7,158 +7,156 @@ import sys
 import os
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/Branch/NavSync/Protected/Cloud')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app, db
+from src.app import db
 from src.models import User, Device, Pilot, LogbookEntry
 from src.services.thingsboard_sync import ThingsBoardSyncService
+from tests.conftest import make_logbook_entry
 
-def test_pilot_management_system():
+def test_pilot_management_system(db_session, device):
     """Test the complete pilot management system functionality."""
     
-    app = create_app()
+    print("=== COMPREHENSIVE PILOT MANAGEMENT SYSTEM TEST ===\n")
     
-    with app.app_context():
-        print("=== COMPREHENSIVE PILOT MANAGEMENT SYSTEM TEST ===\n")
-        
-        # 1. Database Structure Test
-        print("1. DATABASE STRUCTURE TEST")
-        print("-" * 40)
-        
-        # Check if Pilot table exists and has correct structure
-        pilot_count = Pilot.query.count()
-        logbook_count = LogbookEntry.query.count()
-        logbook_with_pilot = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).count()
-        
-        print(f"✅ Pilot table accessible: {pilot_count} mappings")
-        print(f"✅ LogbookEntry table updated: {logbook_count} total entries")
-        print(f"✅ Entries with pilot names: {logbook_with_pilot}")
+    # One mapped and one unmapped pilot flying the device
+    db_session.add(Pilot(pilot_name='Fixture Pilot', user_id=device.user_id, device_id=device.id))
+    make_logbook_entry(db_session, device, pilot_name='Fixture Pilot')
+    make_logbook_entry(db_session, device, pilot_name='Unmapped Pilot')
+    
+    # 1. Database Structure Test
+    print("1. DATABASE STRUCTURE TEST")
+    print("-" * 40)
+    
+    # Check if Pilot table exists and has correct structure
+    pilot_count = Pilot.query.count()
+    logbook_count = LogbookEntry.query.count()
+    logbook_with_pilot = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).count()
+    
+    print(f"✅ Pilot table accessible: {pilot_count} mappings")
+    print(f"✅ LogbookEntry table updated: {logbook_count} total entries")
+    print(f"✅ Entries with pilot names: {logbook_with_pilot}")
+    
+    # 2. Pilot Model Test
+    print("\n2. PILOT MODEL FUNCTIONALITY TEST")
+    print("-" * 40)
+    
+    test_pilot = Pilot.query.first()
+    if test_pilot:
+        entry_count = test_pilot.get_logbook_entry_count()
+        print(f"✅ Pilot model relationships working: {test_pilot}")
+        print(f"✅ Pilot entry count method: {entry_count} entries for {test_pilot.pilot_name}")
+        print(f"✅ User relationship: {test_pilot.user.email}")
+        print(f"✅ Device relationship: {test_pilot.device.name}")
+    else:
+        print("⚠️  No pilot mappings found")
+    
+    # 3. LogbookEntry Pilot Methods Test
+    print("\n3. LOGBOOK ENTRY PILOT METHODS TEST")
+    print("-" * 40)
+    
+    test_entries = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).limit(3).all()
+    
+    for entry in test_entries:
+        pilot_mapping, actual_user = entry.get_pilot_info()
         
-        # 2. Pilot Model Test
-        print("\n2. PILOT MODEL FUNCTIONALITY TEST")
-        print("-" * 40)
+        print(f"\nEntry {entry.id}: {entry.pilot_name}")
+        print(f"  ✅ get_pilot_mapping(): {pilot_mapping is not None}")
+        print(f"  ✅ get_actual_pilot_user(): {actual_user.email if actual_user else 'None'}")
         
-        test_pilot = Pilot.query.first()
-        if test_pilot:
-            entry_count = test_pilot.get_logbook_entry_count()
-            print(f"✅ Pilot model relationships working: {test_pilot}")
-            print(f"✅ Pilot entry count method: {entry_count} entries for {test_pilot.pilot_name}")
-            print(f"✅ User relationship: {test_pilot.user.email}")
-            print(f"✅ Device relationship: {test_pilot.device.name}")
+        if pilot_mapping:
+            print(f"     -> Mapped to: {pilot_mapping.user.email}")
         else:
-            print("⚠️  No pilot mappings found")
-        
-        # 3. LogbookEntry Pilot Methods Test
-        print("\n3. LOGBOOK ENTRY PILOT METHODS TEST")
-        print("-" * 40)
-        
-        test_entries = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).limit(3).all()
-        
-        for entry in test_entries:
-            pilot_mapping = entry.get_pilot_mapping()
-            actual_user = entry.get_actual_pilot_user()
-            
-            print(f"\nEntry {entry.id}: {entry.pilot_name}")
-            print(f"  ✅ get_pilot_mapping(): {pilot_mapping is not None}")
-            print(f"  ✅ get_actual_pilot_user(): {actual_user.email if actual_user else 'None'}")
-            
-            if pilot_mapping:
-                print(f"     -> Mapped to: {pilot_mapping.user.email}")
-            else:
-                device_owner = User.query.get(entry.device.user_id) if entry.device else None
-                print(f"     -> Falls back to device owner: {device_owner.email if device_owner else 'None'}")
+            device_owner = User.query.get(entry.device.user_id) if entry.device else None
+            print(f"     -> Falls back to device owner: {device_owner.email if device_owner else 'None'}")
+    
+    # 4. ThingsBoard Sync Integration Test
+    print("\n4. THINGSBOARD SYNC INTEGRATION TEST")
+    print("-" * 40)
+    
+    try:
+        sync_service = ThingsBoardSyncService()
         
-        # 4. ThingsBoard Sync Integration Test
-        print("\n4. THINGSBOARD SYNC INTEGRATION TEST")
-        print("-" * 40)
+        # Test pilot resolution method exists
+        test_pilot_name = 'Test Pilot'
         
-        try:
-            sync_service = ThingsBoardSyncService()
+        resolved_user_id = sync_service._resolve_pilot_user(device, test_pilot_name)
+        resolved_user_obj = User.query.get(resolved_user_id) if resolved_user_id else None
+        print(f"✅ Sync service pilot resolution: {resolved_user_obj.email if resolved_user_obj else 'Device owner fallback'}")
             
-            # Test pilot resolution method exists
-            test_device = Device.query.first()
-            if test_device:
-                test_pilot_name = 'Test Pilot'
-                
-                resolved_user_id = sync_service._resolve_pilot_user(test_device, test_pilot_name)
-                resolved_user_obj = User.query.get(resolved_user_id) if resolved_user_id else None
-                print(f"✅ Sync service pilot resolution: {resolved_user_obj.email if resolved_user_obj else 'Device owner fallback'}")
-            else:
-                print("⚠️  No devices found for sync test")
-                
-        except Exception as e:
-            print(f"❌ Sync service test failed: {str(e)}")
-        
-        # 5. Admin Interface Data Test
-        print("\n5. ADMIN INTERFACE DATA TEST")
-        print("-" * 40)
-        
-        # Test data that would be used by admin interface
-        all_pilots = Pilot.query.all()
-        all_devices = Device.query.filter_by(is_active=True).all()
-        all_users = User.query.filter_by(is_active=True).all()
-        
-        # Test unmapped pilots query
-        unmapped_pilots = db.session.query(LogbookEntry.pilot_name.distinct().label('pilot_name'))\
-            .filter(LogbookEntry.pilot_name.isnot(None))\
-            .filter(~LogbookEntry.pilot_name.in_(
-                db.session.query(Pilot.pilot_name)
-            )).all()
-        
-        print(f"✅ Admin pilot list query: {len(all_pilots)} mappings")
-        print(f"✅ Admin device list query: {len(all_devices)} devices")
-        print(f"✅ Admin user list query: {len(all_users)} users")
-        print(f"✅ Unmapped pilots query: {len(unmapped_pilots)} unmapped")
-        
-        for pilot in unmapped_pilots:
-            entry_count = LogbookEntry.query.filter_by(pilot_name=pilot.pilot_name).count()
-            print(f"     -> '{pilot.pilot_name}': {entry_count} entries")
-        
-        # 6. Database Constraints Test
-        print("\n6. DATABASE CONSTRAINTS TEST")
-        print("-" * 40)
-        
-        # Check if we can detect existing mappings properly
-        if all_pilots:
-            test_pilot = all_pilots[0]
-            existing_check = Pilot.query.filter_by(
-                pilot_name=test_pilot.pilot_name,
-                device_id=test_pilot.device_id
-            ).first()
-            print(f"✅ Duplicate detection working: {existing_check is not None}")
-            print(f"✅ Unique constraint model defined: pilot_device_uc")
-        else:
-            print("⚠️  No existing pilots to test constraint")
-        
-        # 7. Coverage Statistics
-        print("\n7. SYSTEM COVERAGE STATISTICS")
-        print("-" * 40)
-        
-        total_pilot_names = db.session.query(LogbookEntry.pilot_name.distinct()).filter(LogbookEntry.pilot_name.isnot(None)).count()
-        mapped_pilot_names = db.session.query(Pilot.pilot_name.distinct()).count()
-        
-        coverage = (mapped_pilot_names / total_pilot_names * 100) if total_pilot_names > 0 else 0
-        
-        print(f"Total unique pilot names in logbook: {total_pilot_names}")
-        print(f"Mapped pilot names: {mapped_pilot_names}")
-        print(f"Coverage: {coverage:.1f}%")
-        
-        entries_with_pilots = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).count()
-        entries_with_mappings = LogbookEntry.query.join(Pilot, LogbookEntry.pilot_name == Pilot.pilot_name).count()
-        
-        entry_coverage = (entries_with_mappings / entries_with_pilots * 100) if entries_with_pilots > 0 else 0
-        print(f"Entries with pilot names: {entries_with_pilots}")
-        print(f"Entries with mapped pilots: {entries_with_mappings}")
-        print(f"Entry coverage: {entry_coverage:.1f}%")
-        
-        print("\n=== PILOT MANAGEMENT SYSTEM TEST COMPLETE ===")
-        print("\n🎉 Summary:")
-        print(f"   • Database structure: ✅ Working")
-        print(f"   • Pilot mappings: ✅ {pilot_count} active")
-        print(f"   • Pilot resolution: ✅ Working")
-        print(f"   • Sync integration: ✅ Working")
-        print(f"   • Admin interface ready: ✅ Ready")
-        print(f"   • Coverage: {coverage:.1f}% pilot names, {entry_coverage:.1f}% entries")
-
-if __name__ == '__main__':
-    test_pilot_management_system()
+    except Exception as e:
+        print(f"❌ Sync service test failed: {str(e)}")
+    
+    # 5. Admin Interface Data Test
+    print("\n5. ADMIN INTERFACE DATA TEST")
+    print("-" * 40)
+    
+    # Test data that would be used by admin interface
+    all_pilots = Pilot.query.all()
+    all_devices = Device.query.filter_by(is_active=True).all()
+    all_users = User.query.filter_by(is_active=True).all()
+    
+    # Test unmapped pilots query
+    unmapped_pilots = db.session.query(LogbookEntry.pilot_name.distinct().label('pilot_name'))\
+        .filter(LogbookEntry.pilot_name.isnot(None))\
+        .filter(~LogbookEntry.pilot_name.in_(
+            db.session.query(Pilot.pilot_name)
+        )).all()
+    
+    print(f"✅ Admin pilot list query: {len(all_pilots)} mappings")
+    print(f"✅ Admin device list query: {len(all_devices)} devices")
+    print(f"✅ Admin user list query: {len(all_users)} users")
+    print(f"✅ Unmapped pilots query: {len(unmapped_pilots)} unmapped")
+    
+    for pilot in unmapped_pilots:
+        entry_count = LogbookEntry.query.filter_by(pilot_name=pilot.pilot_name).count()
+        print(f"     -> '{pilot.pilot_name}': {entry_count} entries")
+    
+    # 6. Database Constraints Test
+    print("\n6. DATABASE CONSTRAINTS TEST")
+    print("-" * 40)
+    
+    # Check if we can detect existing mappings properly
+    if all_pilots:
+        test_pilot = all_pilots[0]
+        existing_check = Pilot.query.filter_by(
+            pilot_name=test_pilot.pilot_name,
+            device_id=test_pilot.device_id
+        ).first()
+        print(f"✅ Duplicate detection working: {existing_check is not None}")
+        print(f"✅ Unique constraint model defined: pilot_device_uc")
+    else:
+        print("⚠️  No existing pilots to test constraint")
+    
+    # 7. Coverage Statistics
+    print("\n7. SYSTEM COVERAGE STATISTICS")
+    print("-" * 40)
+    
+    total_pilot_names = db.session.query(LogbookEntry.pilot_name.distinct()).filter(LogbookEntry.pilot_name.isnot(None)).count()
+    mapped_pilot_names = db.session.query(Pilot.pilot_name.distinct()).count()
+    
+    coverage = (mapped_pilot_names / total_pilot_names * 100) if total_pilot_names > 0 else 0
+    
+    print(f"Total unique pilot names in logbook: {total_pilot_names}")
+    print(f"Mapped pilot names: {mapped_pilot_names}")
+    print(f"Coverage: {coverage:.1f}%")
+    
+    entries_with_pilots = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).count()
+    entries_with_mappings = LogbookEntry.query.join(Pilot, LogbookEntry.pilot_name == Pilot.pilot_name).count()
+    
+    entry_coverage = (entries_with_mappings / entries_with_pilots * 100) if entries_with_pilots > 0 else 0
+    print(f"Entries with pilot names: {entries_with_pilots}")
+    print(f"Entries with mapped pilots: {entries_with_mappings}")
+    print(f"Entry coverage: {entry_coverage:.1f}%")
+    
+    print("\n=== PILOT MANAGEMENT SYSTEM TEST COMPLETE ===")
+    print("\n🎉 Summary:")
+    print(f"   • Database structure: ✅ Working")
+    print(f"   • Pilot mappings: ✅ {pilot_count} active")
+    print(f"   • Pilot resolution: ✅ Working")
+    print(f"   • Sync integration: ✅ Working")
+    print(f"   • Admin interface ready: ✅ Ready")
+    print(f"   • Coverage: {coverage:.1f}% pilot names, {entry_coverage:.1f}% entries")
+    
+    # Half of the seeded pilot names (and entries) are mapped
+    return pilot_count == 1 and len(unmapped_pilots) == 1 and coverage == 50.0 and entry_coverage == 50.0
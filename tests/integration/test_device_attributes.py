@@ -5,37 +5,39 @@ Test script to verify Device model attributes
 
 import sys
 import os
+from sqlalchemy.orm import joinedload
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.app import create_app, db
-from src.models import LogbookEntry, Device
+from src.app import create_app
+from src.models import LogbookEntry
 
-def test_device_attributes():
+def test_device_attributes(db_session, logbook_entry):
     """Test that Device model has the correct attributes"""
-    app = create_app()
+    # Get the fixture's synced entry by primary key
+    synced_entry = db_session.get(LogbookEntry, logbook_entry.id, options=[joinedload(LogbookEntry.device)])
     
-    with app.app_context():
-        # Get a synced entry
-        synced_entry = LogbookEntry.query.filter(LogbookEntry.device_id.isnot(None)).first()
+    if synced_entry:
+        print(f"✅ Found synced entry ID: {synced_entry.id}")
         
-        if synced_entry:
-            print(f"✅ Found synced entry ID: {synced_entry.id}")
+        if synced_entry.device:
+            print(f"✅ Device found: {synced_entry.device}")
+            print(f"✅ Device name: {synced_entry.device.name}")
+            print(f"✅ Device registration: {synced_entry.device.registration}")
+            print(f"✅ Device type: {synced_entry.device.device_type}")
+            
+            # Test the logic used in clear function
+            device_name = synced_entry.device.name if synced_entry.device else f"Device ID {synced_entry.device_id}"
+            print(f"✅ Device name for logging: {device_name}")
             
-            if synced_entry.device:
-                print(f"✅ Device found: {synced_entry.device}")
-                print(f"✅ Device name: {synced_entry.device.name}")
-                print(f"✅ Device registration: {synced_entry.device.registration}")
-                print(f"✅ Device type: {synced_entry.device.device_type}")
-                
-                # Test the logic used in clear function
-                device_name = synced_entry.device.name if synced_entry.device else f"Device ID {synced_entry.device_id}"
-                print(f"✅ Device name for logging: {device_name}")
-                
-            else:
-                print(f"❌ No device found for entry {synced_entry.id}")
         else:
-            print("ℹ️  No synced entries found to test")
+            print(f"❌ No device found for entry {synced_entry.id}")
+    else:
+        print("ℹ️  No synced entries found to test")
 
 if __name__ == "__main__":
     print("🧪 Testing Device model attributes...")
-    test_device_attributes()
+    from tests.conftest import make_device, make_logbook_entry, make_user, transactional_session
+    
+    with transactional_session(create_app()) as db_session:
+        device = make_device(db_session, make_user(db_session))
+        test_device_attributes(db_session, make_logbook_entry(db_session, device))
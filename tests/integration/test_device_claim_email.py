@@ -2,32 +2,43 @@
 """
 Test script for device claiming email functionality
 """
-import requests
+import os
 import json
 import sys
+import time
 
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-def test_device_claim_email():
+CLAIM_URL = "/api/external/claim-device"  # Served in-process by the test client
+
+# Static part of the claim request; device_id and the claiming user's email change per run
+TEST_DEVICE_FIELDS = {
+    "device_name": "Test Email Aircraft",
+    "device_type": "aircraft",
+    "model": "Cessna 172 Email Test",
+    "serial_number": "TEST-EMAIL-001",
+    "registration": "N999EM"
+}
+
+def test_device_claim_email(client, user):
     """Test the device claiming API with email notification."""
     
     # Configuration
-    BASE_URL = "http://127.0.0.1:5000"
-    API_KEY = "TcNFCrHyv1w9uCejGgvloANlYkETd1eDoqQJKA7byh8"  # From .env file
+    API_KEY = (client.application.config.get('EXTERNAL_API_KEY') or
+               os.environ.get('EXTERNAL_API_KEY') or
+               'kanardia-external-api-key-2025-change-in-production')
     
     # Test data
     test_device = {
-        "user_email": "rok@kanardia.eu",  # Use an existing user email
-        "device_name": "Test Email Aircraft",
-        "device_id": f"test_email_device_{int(__import__('time').time())}",  # Unique ID
-        "device_type": "aircraft",
-        "model": "Cessna 172 Email Test",
-        "serial_number": "TEST-EMAIL-001",
-        "registration": "N999EM"
+        **TEST_DEVICE_FIELDS,
+        "device_id": f"test_email_device_{time.time_ns()}_{os.getpid()}",  # Unique across parallel workers
+        "user_email": user.email,
     }
     
     print("Testing Device Claiming Email Functionality")
     print("=" * 50)
-    print(f"API Endpoint: {BASE_URL}/api/external/claim-device")
+    print(f"API Endpoint: {CLAIM_URL}")
     print(f"Test Device: {test_device['device_name']} for {test_device['user_email']}")
     print()
     
@@ -38,11 +49,10 @@ def test_device_claim_email():
             'X-API-Key': API_KEY
         }
         
-        response = requests.post(
-            f"{BASE_URL}/api/external/claim-device",
+        response = client.post(
+            CLAIM_URL,
             headers=headers,
-            json=test_device,
-            timeout=30
+            json=test_device
         )
         
         print(f"Status Code: {response.status_code}")
@@ -50,7 +60,7 @@ def test_device_claim_email():
         print()
         
         if response.status_code == 201:
-            result = response.json()
+            result = response.get_json()
             print("✅ Device claimed successfully!")
             print(f"   Device ID: {result['device']['id']}")
             print(f"   Device Name: {result['device']['name']}")
@@ -62,47 +72,22 @@ def test_device_claim_email():
             print("   Also check spam/junk folder if not found in inbox.")
             
         elif response.status_code == 409:
-            result = response.json()
+            result = response.get_json()
             print(f"⚠️  Device already claimed: {result.get('message', 'Unknown error')}")
             print("   This is expected if running the test multiple times.")
             
         else:
             print(f"❌ Request failed with status {response.status_code}")
             try:
-                error_data = response.json()
+                error_data = response.get_json()
                 print(f"   Error: {error_data.get('error', 'Unknown error')}")
                 print(f"   Message: {error_data.get('message', 'No message')}")
             except:
-                print(f"   Response text: {response.text}")
+                print(f"   Response text: {response.get_data(as_text=True)}")
+            return False
         
-    except requests.exceptions.ConnectionError:
-        print("❌ Connection failed - make sure the Flask application is running on port 5000")
-        return False
-    except requests.exceptions.Timeout:
-        print("❌ Request timed out")
-        return False
     except Exception as e:
         print(f"❌ Unexpected error: {str(e)}")
         return False
     
     return True
-
-
-if __name__ == '__main__':
-    print("Device Claiming Email Test")
-    print("This script tests the email notification functionality")
-    print("when a device is claimed via the API.")
-    print()
-    
-    success = test_device_claim_email()
-    
-    if success:
-        print()
-        print("Next steps:")
-        print("1. Check the email inbox for the notification")
-        print("2. Test the admin email functionality at: http://127.0.0.1:5000/admin/test-email")
-        print("3. Review the application logs for any email errors")
-    else:
-        print()
-        print("Test failed. Please check the application logs and try again.")
-        sys.exit(1)
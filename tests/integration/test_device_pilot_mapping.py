@@ -6,106 +6,106 @@ Test the device owner pilot mapping functionality.
 import sys
 import os
 from datetime import datetime, date
+from sqlalchemy import and_, func
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/src/Cloud-1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app, db
-from src.models import User, Device, Pilot, LogbookEntry
+from src.models import User, Pilot, LogbookEntry
+from tests.conftest import make_logbook_entry, make_user
 
-def test_device_owner_pilot_mapping():
+def test_device_owner_pilot_mapping(db_session, device):
     """Test the device owner pilot mapping functionality."""
     
     print("🧪 Testing Device Owner Pilot Mapping Functionality")
     print("=" * 55)
     
-    app = create_app()
-    
-    with app.app_context():
+    try:
+        # 1. Give the device a mapped and an unmapped pilot, and a second user to map to
+        db_session.add(Pilot(pilot_name='Fixture Pilot', user_id=device.user_id, device_id=device.id))
+        make_logbook_entry(db_session, device, pilot_name='Fixture Pilot')
+        make_logbook_entry(db_session, device, pilot_name='Unmapped Pilot')
+        make_user(db_session, email='second.pilot@example.com', nickname='Second Pilot')
+        
+        print(f"✅ Using device: {device.name} (owner: {device.owner.nickname})")
+        print(f"   Device ID: {device.id}")
+        print(f"   Owner ID: {device.user_id}")
+        
+        # 2. Check current pilot mappings for this device
+        current_mappings = Pilot.query.filter_by(device_id=device.id, is_active=True).all()
+        print(f"\n📋 Current pilot mappings: {len(current_mappings)}")
+        if current_mappings:
+            print("\n".join(f"   • '{mapping.pilot_name}' -> {mapping.user.email}" for mapping in current_mappings))
+        
+        # 3. Check for unmapped pilots in logbook entries (names and entry counts in one query)
+        unmapped_pilots = db_session.query(
+                LogbookEntry.pilot_name,
+                func.count(LogbookEntry.id).label('entry_count')
+            )\
+            .outerjoin(Pilot, and_(
+                Pilot.device_id == LogbookEntry.device_id,
+                Pilot.pilot_name == LogbookEntry.pilot_name
+            ))\
+            .filter(LogbookEntry.device_id == device.id)\
+            .filter(LogbookEntry.pilot_name.isnot(None))\
+            .filter(Pilot.id.is_(None))\
+            .group_by(LogbookEntry.pilot_name).all()
+        
+        print(f"\n⚠️  Unmapped pilots in logbook: {len(unmapped_pilots)}")
+        if unmapped_pilots:
+            print("\n".join(f"   • '{pilot.pilot_name}' ({pilot.entry_count} entries)" for pilot in unmapped_pilots))
+        
+        # 4. Test the new routes (simulate)
+        print(f"\n🌐 Routes that should be accessible:")
+        print(f"   • GET  /dashboard/devices/{device.id}/pilots")
+        print(f"   • POST /dashboard/devices/{device.id}/pilots/create")
+        print(f"   • POST /dashboard/devices/{device.id}/pilots/<pilot_id>/delete")
+        print(f"   • GET  /dashboard/api/devices/{device.id}/pilots/suggestions")
+        
+        # 5. Test form functionality
+        print(f"\n📝 Form can be imported:")
         try:
-            # 1. Find a device with an owner
-            device = Device.query.filter_by(is_active=True).first()
-            if not device:
-                print("❌ No active devices found")
-                return False
-            
-            print(f"✅ Using device: {device.name} (owner: {device.owner.nickname})")
-            print(f"   Device ID: {device.id}")
-            print(f"   Owner ID: {device.user_id}")
-            
-            # 2. Check current pilot mappings for this device
-            current_mappings = Pilot.query.filter_by(device_id=device.id, is_active=True).all()
-            print(f"\n📋 Current pilot mappings: {len(current_mappings)}")
-            for mapping in current_mappings:
-                print(f"   • '{mapping.pilot_name}' -> {mapping.user.email}")
-            
-            # 3. Check for unmapped pilots in logbook entries
-            unmapped_pilots = db.session.query(LogbookEntry.pilot_name.distinct().label('pilot_name'))\
-                .filter(LogbookEntry.device_id == device.id)\
-                .filter(LogbookEntry.pilot_name.isnot(None))\
-                .filter(~LogbookEntry.pilot_name.in_(
-                    db.session.query(Pilot.pilot_name).filter_by(device_id=device.id)
-                )).all()
-            
-            print(f"\n⚠️  Unmapped pilots in logbook: {len(unmapped_pilots)}")
-            for pilot in unmapped_pilots:
-                entry_count = LogbookEntry.query.filter_by(
-                    device_id=device.id,
-                    pilot_name=pilot.pilot_name
-                ).count()
-                print(f"   • '{pilot.pilot_name}' ({entry_count} entries)")
-            
-            # 4. Test the new routes (simulate)
-            print(f"\n🌐 Routes that should be accessible:")
-            print(f"   • GET  /dashboard/devices/{device.id}/pilots")
-            print(f"   • POST /dashboard/devices/{device.id}/pilots/create")
-            print(f"   • POST /dashboard/devices/{device.id}/pilots/<pilot_id>/delete")
-            print(f"   • GET  /dashboard/api/devices/{device.id}/pilots/suggestions")
-            
-            # 5. Test form functionality
-            print(f"\n📝 Form can be imported:")
-            try:
-                from src.forms import DevicePilotMappingForm
-                print(f"   ✅ DevicePilotMappingForm imported successfully")
-                print(f"   • Has pilot_name field")
-                print(f"   • Has user_email field")
-                print(f"   • Has submit field")
-            except ImportError as e:
-                print(f"   ❌ Import error: {e}")
-            
-            # 6. Check if device logbook template has the pilot management link
-            print(f"\n🔗 Device logbook should show 'Manage Pilots' button for device owner")
-            print(f"   Template condition: device.user_id == current_user.id")
-            print(f"   Device owner ID: {device.user_id}")
-            
-            # 7. Test pilot mapping creation logic (dry run)
-            test_user = User.query.filter(User.id != device.user_id).first()
-            if test_user and unmapped_pilots:
-                test_pilot_name = unmapped_pilots[0].pilot_name
-                print(f"\n🧪 Test mapping creation (dry run):")
-                print(f"   Pilot name: '{test_pilot_name}'")
-                print(f"   Target user: {test_user.email}")
-                print(f"   Device: {device.name}")
-                print(f"   ✅ This mapping would be valid")
-            else:
-                print(f"\n⚠️  Cannot test mapping creation - need unmapped pilot and different user")
-            
-            # 8. Verify access control
-            print(f"\n🔒 Access control checks:")
-            print(f"   • Only device owner can access pilot management")
-            print(f"   • Device owner ID: {device.user_id}")
-            print(f"   • Other users should get 404")
-            
-            print(f"\n✅ All functionality tests completed successfully!")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Test failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            from src.forms import DevicePilotMappingForm
+            print(f"   ✅ DevicePilotMappingForm imported successfully")
+            print(f"   • Has pilot_name field")
+            print(f"   • Has user_email field")
+            print(f"   • Has submit field")
+        except ImportError as e:
+            print(f"   ❌ Import error: {e}")
+        
+        # 6. Check if device logbook template has the pilot management link
+        print(f"\n🔗 Device logbook should show 'Manage Pilots' button for device owner")
+        print(f"   Template condition: device.user_id == current_user.id")
+        print(f"   Device owner ID: {device.user_id}")
+        
+        # 7. Test pilot mapping creation logic (dry run)
+        test_user = User.query.filter(User.id != device.user_id).first()
+        if test_user and unmapped_pilots:
+            test_pilot_name = unmapped_pilots[0].pilot_name
+            print(f"\n🧪 Test mapping creation (dry run):")
+            print(f"   Pilot name: '{test_pilot_name}'")
+            print(f"   Target user: {test_user.email}")
+            print(f"   Device: {device.name}")
+            print(f"   ✅ This mapping would be valid")
+        else:
+            print(f"\n⚠️  Cannot test mapping creation - need unmapped pilot and different user")
+        
+        # 8. Verify access control
+        print(f"\n🔒 Access control checks:")
+        print(f"   • Only device owner can access pilot management")
+        print(f"   • Device owner ID: {device.user_id}")
+        print(f"   • Other users should get 404")
+        
+        if len(current_mappings) != 1 or [pilot.pilot_name for pilot in unmapped_pilots] != ['Unmapped Pilot'] \
+                or test_user is None:
+            print("❌ Pilot mappings do not match the seeded data")
             return False
-
-if __name__ == '__main__':
-    success = test_device_owner_pilot_mapping()
-    print(f"\n{'✅ SUCCESS' if success else '❌ FAILED'}")
-    sys.exit(0 if success else 1)
+        
+        print(f"\n✅ All functionality tests completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
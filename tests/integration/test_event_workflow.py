@@ -5,14 +5,11 @@ Test ThingsBoard event sync with mock RPC call to simulate actual device sync.
 
 import sys
 import os
-from datetime import datetime, timedelta
-import json
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/Branch/NavSync/Protected/Cloud')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app
-from src.models import Event, Device, User, db
+from src.models import Event
 from src.services.thingsboard_sync import ThingsBoardSyncService
 
 def simulate_thingsboard_events_rpc():
@@ -22,156 +19,106 @@ def simulate_thingsboard_events_rpc():
     mock_events_response = [
         {
             'date_time': '2025-07-31 12:00:00',
-            'page_address': 1000,
+            'page': 1000,
             'total_time': 30000,  # 30 seconds
-            'bitfield': 0b00000011  # AnyEngStart + Takeoff
+            'bits': 0b00000011  # AnyEngStart + Takeoff
         },
         {
             'date_time': '2025-07-31 12:05:30',
-            'page_address': 1001,
+            'page': 1001,
             'total_time': 45000,  # 45 seconds
-            'bitfield': 0b00010000  # Flying
+            'bits': 0b00010000  # Flying
         },
         {
             'date_time': '2025-07-31 12:15:15',
-            'page_address': 1002,
+            'page': 1002,
             'total_time': 20000,  # 20 seconds
-            'bitfield': 0b00000100  # Landing
+            'bits': 0b00000100  # Landing
         },
         {
             'date_time': '2025-07-31 12:20:00',
-            'page_address': 1003,
+            'page': 1003,
             'total_time': 10000,  # 10 seconds
-            'bitfield': 0b00001000  # LastEngStop
+            'bits': 0b00001000  # LastEngStop
         }
     ]
     
     return mock_events_response
 
-def test_full_event_sync_workflow():
+def test_full_event_sync_workflow(db_session, device):
     """Test the complete event sync workflow."""
     
     print("🎯 Testing complete Event sync workflow...")
     
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            # Get a device for testing
-            device = Device.query.first()
-            if not device:
-                print("❌ No device found for testing")
-                return False
-            
-            print(f"📱 Using device: {device.name} (ID: {device.id})")
-            
-            # Create sync service instance
-            sync_service = ThingsBoardSyncService()
-            
-            # Get initial event count
-            initial_count = Event.query.filter_by(device_id=device.id).count()
-            print(f"📊 Initial event count for device: {initial_count}")
-            
-            # Simulate events from ThingsBoard
-            mock_events = simulate_thingsboard_events_rpc()
-            print(f"🔄 Processing {len(mock_events)} mock events...")
-            
-            success_count = 0
-            for i, event_data in enumerate(mock_events, 1):
-                current_logger_page = 100 + i
-                result = sync_service._process_device_event(device, event_data, current_logger_page)
-                if result:
-                    success_count += 1
-                    # Find the created event
-                    created_event = Event.query.filter_by(
-                        device_id=device.id,
-                        page_address=event_data['page_address']
-                    ).first()
-                    if created_event:
-                        active_events = created_event.get_active_events()
-                        events_str = ', '.join(active_events) if active_events else 'None'
-                        print(f"   ✅ Event {i}: Page {event_data['page_address']} - [{events_str}]")
-                    else:
-                        print(f"   ✅ Event {i}: Page {event_data['page_address']} - processed")
+    try:
+        print(f"📱 Using device: {device.name} (ID: {device.id})")
+        
+        # Create sync service instance
+        sync_service = ThingsBoardSyncService()
+        
+        # Get initial event count
+        initial_count = Event.query.filter_by(device_id=device.id).count()
+        print(f"📊 Initial event count for device: {initial_count}")
+        
+        # Simulate events from ThingsBoard
+        mock_events = simulate_thingsboard_events_rpc()
+        print(f"🔄 Processing {len(mock_events)} mock events...")
+        
+        success_count = 0
+        for i, event_data in enumerate(mock_events, 1):
+            result = sync_service._process_device_event(device, event_data)
+            if result:
+                success_count += 1
+                # Find the created event
+                created_event = Event.query.filter_by(
+                    device_id=device.id,
+                    page_address=event_data['page']
+                ).first()
+                if created_event:
+                    active_events = created_event.get_active_events()
+                    events_str = ', '.join(active_events) if active_events else 'None'
+                    print(f"   ✅ Event {i}: Page {event_data['page']} - [{events_str}]")
                 else:
-                    print(f"   ❌ Event {i}: Failed to process")
-            
-            # Check final event count
-            final_count = Event.query.filter_by(device_id=device.id).count()
-            print(f"📊 Final event count for device: {final_count}")
-            print(f"🎉 Successfully processed {success_count}/{len(mock_events)} events")
-            
-            # Display all events for this device
-            print("\n📋 All events for device:")
-            events = Event.query.filter_by(device_id=device.id).order_by(Event.date_time).all()
-            for event in events:
-                active_events = event.get_active_events()
-                events_str = ', '.join(active_events) if active_events else 'None'
-                print(f"   🗓️  {event.date_time} | Page: {event.page_address} | Events: [{events_str}] | Time: {event.total_time}ms")
-            
-            # Test admin page functionality
-            print("\n🌐 Testing admin functionality...")
-            
-            # Simulate filtering by event type
-            takeoff_events = [e for e in events if e.has_event_bit('Takeoff')]
-            landing_events = [e for e in events if e.has_event_bit('Landing')]
-            flying_events = [e for e in events if e.has_event_bit('Flying')]
-            
-            print(f"   🛫 Takeoff events: {len(takeoff_events)}")
-            print(f"   🛬 Landing events: {len(landing_events)}")
-            print(f"   ✈️  Flying events: {len(flying_events)}")
-            
-            # Clean up test events
-            print("\n🧹 Cleaning up test events...")
-            Event.query.filter_by(device_id=device.id).filter(Event.page_address >= 1000).delete()
-            db.session.commit()
-            
-            cleaned_count = Event.query.filter_by(device_id=device.id).count()
-            print(f"📊 Event count after cleanup: {cleaned_count}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Test failed with error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+                    print(f"   ✅ Event {i}: Page {event_data['page']} - processed")
+            else:
+                print(f"   ❌ Event {i}: Failed to process")
+        
+        # Check final event count
+        final_count = Event.query.filter_by(device_id=device.id).count()
+        print(f"📊 Final event count for device: {final_count}")
+        print(f"🎉 Successfully processed {success_count}/{len(mock_events)} events")
+        
+        # Display all events for this device
+        print("\n📋 All events for device:")
+        events = Event.query.filter_by(device_id=device.id).order_by(Event.date_time).all()
+        for event in events:
+            active_events = event.get_active_events()
+            events_str = ', '.join(active_events) if active_events else 'None'
+            print(f"   🗓️  {event.date_time} | Page: {event.page_address} | Events: [{events_str}] | Time: {event.total_time}ms")
+        
+        # Test admin page functionality
+        print("\n🌐 Testing admin functionality...")
+        
+        # Simulate filtering by event type
+        takeoff_events = [e for e in events if e.has_event_bit('Takeoff')]
+        landing_events = [e for e in events if e.has_event_bit('Landing')]
+        flying_events = [e for e in events if e.has_event_bit('Flying')]
+        
+        print(f"   🛫 Takeoff events: {len(takeoff_events)}")
+        print(f"   🛬 Landing events: {len(landing_events)}")
+        print(f"   ✈️  Flying events: {len(flying_events)}")
+        
+        # Every mock event was stored, one takeoff and one landing among them
+        if success_count != len(mock_events) or final_count - initial_count != len(mock_events) \
+                or len(takeoff_events) != 1 or len(landing_events) != 1:
+            print("❌ Not every mock event was stored as expected")
             return False
-
-def main():
-    """Main test function."""
-    print("=" * 70)
-    print("TESTING: Complete Event System Workflow")
-    print("=" * 70)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-    
-    # Test complete workflow
-    workflow_success = test_full_event_sync_workflow()
-    
-    print("\n" + "=" * 70)
-    print("WORKFLOW TEST RESULTS:")
-    print(f"  Event sync workflow:    {'✅ PASS' if workflow_success else '❌ FAIL'}")
-    
-    if workflow_success:
-        print("\n🎉 Event system is fully functional!")
-        print("   ✅ Event model working correctly")
-        print("   ✅ ThingsBoard sync processing events")
-        print("   ✅ Admin interface ready for use") 
-        print("   ✅ Event filtering and display working")
-        print("   ✅ Database operations successful")
-        print("\n🚀 The Event system is ready for production use!")
-        print("   - Events will be synced from ThingsBoard devices")
-        print("   - Admin interface available at /admin/events")
-        print("   - Event details viewable at /admin/events/<id>")
-    else:
-        print("\n💥 Event system has issues!")
-        print("   Check the output above for details")
-    
-    print(f"\nCompleted at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 70)
-    
-    return workflow_success
-
-if __name__ == '__main__':
-    success = main()
-    sys.exit(0 if success else 1)
+        
+        # No clean-up: the test transaction is rolled back
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed with error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
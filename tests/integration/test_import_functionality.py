@@ -3,16 +3,24 @@
 Test script to verify checklist import functionality.
 """
 
-import json
+import os
+import sys
 import xml.etree.ElementTree as ET
 
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tests.conftest import json_loads
+
+SECTION_TITLES = frozenset({'Pre-flight Checklist', 'External Inspection', 'Cockpit Setup'})
+
 def test_json_import():
     """Test JSON file import parsing."""
     print("🧪 Testing JSON import...")
     
     try:
-        with open('test_checklist.json', 'r') as f:
-            json_content = json.load(f)
+        with open('test_checklist.json', 'rb') as f:
+            json_content = json_loads(f.read())
         
         print("✅ JSON file loaded successfully")
         print(f"📊 Checklist name: {json_content['CheckList']['Name']}")
@@ -36,32 +44,12 @@ def test_txt_import():
         with open('test_checklist.txt', 'r') as f:
             content = f.read()
         
-        lines = [line.strip() for line in content.split('\n') if line.strip()]
+        lines = [line for line in map(str.strip, content.splitlines()) if line]
         print(f"✅ TXT file loaded successfully")
         print(f"📊 Number of items: {len(lines)}")
         
-        # Simulate conversion to JSON structure
-        json_content = {
-            "CheckList": {
-                "Type": 1,
-                "Name": "Test Checklist",
-                "Children": [
-                    {
-                        "Type": 2,
-                        "Name": "Imported Checklist",
-                        "Children": [
-                            {
-                                "Type": 3,
-                                "Name": line,
-                                "Children": []
-                            } for line in lines
-                        ]
-                    }
-                ]
-            }
-        }
-        
-        print(f"📋 Generated JSON structure with {len(json_content['CheckList']['Children'][0]['Children'])} items")
+        # The import wraps each line as one item in a single section, so the item count is the line count
+        print(f"📋 Generated JSON structure with {len(lines)} items")
         return True
     except Exception as e:
         print(f"❌ TXT import test failed: {e}")
@@ -72,19 +60,16 @@ def test_xml_import():
     print("\n🧪 Testing XML import...")
     
     try:
-        with open('test_checklist.xml', 'r') as f:
-            content = f.read()
-        
-        root = ET.fromstring(content)
-        print("✅ XML file parsed successfully")
-        
-        # Extract all text items
+        # Stream the file and drop each element once read instead of building the whole tree
         items = []
-        for element in root.iter():
-            if element.text and element.text.strip():
-                text = element.text.strip()
-                if text not in ['Pre-flight Checklist', 'External Inspection', 'Cockpit Setup']:
+        for _, element in ET.iterparse('test_checklist.xml', events=('end',)):
+            # Only leaf elements carry checklist items; containers just hold whitespace
+            if len(element) == 0:
+                text = (element.text or '').strip()
+                if text and text not in SECTION_TITLES:
                     items.append(text)
+            element.clear()
+        print("✅ XML file parsed successfully")
         
         print(f"📊 Extracted {len(items)} items from XML")
         
@@ -7,77 +7,86 @@ import os
 import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from sqlalchemy import func
 
-# Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from app import create_app
-from models import db, Device, Event
-from services.thingsboard_sync import ThingsBoardSyncService
+from src.models import Device, Event
+from src.services.thingsboard_sync import thingsboard_sync
+from tests.conftest import make_flight_events
 
-def test_logbook_from_events():
+def test_logbook_from_events(db_session, device):
     """Test logbook entry generation from events."""
     # Load environment variables
     load_dotenv()
     
-    # Create Flask app context
-    app = create_app()
+    print("Logbook from Events Test")
+    print("=" * 40)
     
-    with app.app_context():
-        print("Logbook from Events Test")
-        print("=" * 40)
-        
-        # Find devices with events
-        devices_with_events = db.session.query(Device).join(Event).distinct().all()
-        
-        if not devices_with_events:
-            print("❌ No devices with events found")
-            return False
+    # One engine run with a one-hour flight on the fixture device
+    make_flight_events(db_session, device)
+    
+    # Find devices with events
+    # EXISTS stops at each device's first event instead of joining and de-duplicating them all
+    devices_with_events = db_session.query(Device).filter(
+        db_session.query(Event.id).filter(Event.device_id == Device.id).exists()
+    ).all()
+    
+    if not devices_with_events:
+        print("❌ No devices with events found")
+        return False
+    
+    print(f"Found {len(devices_with_events)} devices with events:")
+    
+    sync_service = thingsboard_sync  # Shared instance: one HTTP session and token for every test
+    
+    # Total, takeoff and landing event counts for every device in one grouped query
+    event_counts = {
+        device_id: (total, takeoffs, landings)
+        for device_id, total, takeoffs, landings in db_session.query(
+            Event.device_id,
+            func.count(Event.id),
+            func.count(Event.id).filter(Event.bitfield.op('&')(1 << 1) != 0),  # Takeoff bit
+            func.count(Event.id).filter(Event.bitfield.op('&')(1 << 2) != 0)   # Landing bit
+        ).filter(
+            Event.device_id.in_([device.id for device in devices_with_events])
+        ).group_by(Event.device_id)
+    }
+    
+    new_entries = 0
+    for device in devices_with_events:
+        print(f"\nDevice: {device.name} (ID: {device.id})")
         
-        print(f"Found {len(devices_with_events)} devices with events:")
+        # Get event counts
+        total_events, takeoff_events, landing_events = event_counts[device.id]
         
-        sync_service = ThingsBoardSyncService()
+        print(f"  Total events: {total_events}")
+        print(f"  Takeoff events: {takeoff_events}")
+        print(f"  Landing events: {landing_events}")
         
-        for device in devices_with_events:
-            print(f"\nDevice: {device.name} (ID: {device.id})")
+        if takeoff_events > 0 and landing_events > 0:
+            print(f"  ✅ Has takeoff/landing events - testing logbook generation")
             
-            # Get event counts
-            total_events = Event.query.filter_by(device_id=device.id).count()
-            takeoff_events = Event.query.filter_by(device_id=device.id).filter(
-                Event.bitfield.op('&')(1 << 1) != 0  # Takeoff bit
-            ).count()
-            landing_events = Event.query.filter_by(device_id=device.id).filter(
-                Event.bitfield.op('&')(1 << 2) != 0  # Landing bit
-            ).count()
-            
-            print(f"  Total events: {total_events}")
-            print(f"  Takeoff events: {takeoff_events}")
-            print(f"  Landing events: {landing_events}")
-            
-            if takeoff_events > 0 and landing_events > 0:
-                print(f"  ✅ Has takeoff/landing events - testing logbook generation")
+            try:
+                # Test the logbook generation
+                results = sync_service._build_logbook_entries_from_events(device)
                 
-                try:
-                    # Test the logbook generation
-                    results = sync_service._build_logbook_entries_from_events(device)
-                    
-                    print(f"  Results: {results['new_entries']} new logbook entries")
-                    if results['errors']:
-                        print(f"  Errors: {results['errors']}")
-                    
-                    # Commit changes
-                    db.session.commit()
-                    
-                except Exception as e:
-                    print(f"  ❌ Error: {str(e)}")
-                    db.session.rollback()
-            else:
-                print(f"  ⚠️  Not enough takeoff/landing events for logbook generation")
-        
-        print("\n" + "=" * 40)
-        print("Logbook from events test completed")
-        return True
-
-if __name__ == "__main__":
-    success = test_logbook_from_events()
-    sys.exit(0 if success else 1)
+                print(f"  Results: {results['new_entries']} new logbook entries")
+                new_entries += results['new_entries']
+                if results['errors']:
+                    print(f"  Errors: {results['errors']}")
+                
+                # Commit changes
+                db_session.commit()
+                
+            except Exception as e:
+                print(f"  ❌ Error: {str(e)}")
+                db_session.rollback()
+        else:
+            print(f"  ⚠️  Not enough takeoff/landing events for logbook generation")
+    
+    print("\n" + "=" * 40)
+    print("Logbook from events test completed")
+    # The seeded flight becomes exactly one logbook entry
+    return new_entries == 1
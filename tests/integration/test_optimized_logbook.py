@@ -7,117 +7,138 @@ import os
 import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from sqlalchemy import case, func, lambda_stmt, literal, select
+from sqlalchemy.orm import raiseload, selectinload
 
-# Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from app import create_app
-from models import db, Device, Event, LogbookEntry, User
-from services.thingsboard_sync import ThingsBoardSyncService
+from src.models import Device, Event, LogbookEntry, User
+from src.services.thingsboard_sync import thingsboard_sync
+from tests.conftest import make_flight_events
 
-def test_optimized_logbook():
+def test_optimized_logbook(db_session, device):
     """Test the optimized logbook generation system."""
     # Load environment variables
     load_dotenv()
     
-    # Create Flask app context
-    app = create_app()
+    print("Optimized Logbook Generation Test")
+    print("=" * 50)
     
-    with app.app_context():
-        print("Optimized Logbook Generation Test")
-        print("=" * 50)
-        
-        # Find devices with events
-        devices_with_events = db.session.query(Device).join(Event).distinct().all()
-        
-        if not devices_with_events:
-            print("❌ No devices with events found")
-            return False
+    # One engine run with a one-hour flight on the fixture device
+    make_flight_events(db_session, device)
+    
+    # Find devices with events
+    # EXISTS stops at each device's first event instead of joining and de-duplicating them all
+    devices_with_events = db_session.query(Device).filter(
+        db_session.query(Event.id).filter(Event.device_id == Device.id).exists()
+    ).all()
+    
+    if not devices_with_events:
+        print("❌ No devices with events found")
+        return False
+    
+    print(f"Found {len(devices_with_events)} devices with events:")
+    
+    sync_service = thingsboard_sync  # Shared instance: one HTTP session and token for every test
+    
+    new_entries = 0
+    for device in devices_with_events:
+        print(f"\n📱 Device: {device.name} (ID: {device.id})")
+        print(f"   Owner: {device.owner.email if device.owner else 'No owner'}")
         
-        print(f"Found {len(devices_with_events)} devices with events:")
+        # Get current statistics (lambda statements are built and cached once, then rebound per device)
+        device_id = device.id
+        total_events = db_session.execute(lambda_stmt(
+            lambda: select(func.count(Event.id)).where(Event.device_id == device_id)
+        )).scalar_one()
+        existing_logbook_entries = db_session.execute(lambda_stmt(
+            lambda: select(func.count(LogbookEntry.id)).where(LogbookEntry.device_id == device_id)
+        )).scalar_one()
         
-        sync_service = ThingsBoardSyncService()
+        print(f"   📊 Current state:")
+        print(f"     - Total events: {total_events}")
+        print(f"     - Existing logbook entries: {existing_logbook_entries}")
         
-        for device in devices_with_events:
-            print(f"\n📱 Device: {device.name} (ID: {device.id})")
-            print(f"   Owner: {device.user.email if device.user else 'No owner'}")
-            
-            # Get current statistics
-            total_events = Event.query.filter_by(device_id=device.id).count()
-            existing_logbook_entries = LogbookEntry.query.filter_by(device_id=device.id).count()
+        # Test incremental processing (simulate having 3 new events)
+        if total_events >= 3:
+            print(f"   🔄 Testing incremental processing with 3 'new' events...")
             
-            print(f"   📊 Current state:")
-            print(f"     - Total events: {total_events}")
-            print(f"     - Existing logbook entries: {existing_logbook_entries}")
-            
-            # Test incremental processing (simulate having 3 new events)
-            if total_events >= 3:
-                print(f"   🔄 Testing incremental processing with 3 'new' events...")
+            try:
+                # Test the new incremental method
+                results = sync_service._build_logbook_entries_from_new_events(device, 3)
                 
-                try:
-                    # Test the new incremental method
-                    results = sync_service._build_logbook_entries_from_new_events(device, 3)
-                    
-                    print(f"   ✅ Incremental processing results:")
-                    print(f"     - New logbook entries: {results['new_entries']}")
-                    print(f"     - Updated entries: {results['updated_entries']}")
-                    print(f"     - Errors: {len(results['errors'])}")
-                    
-                    if results['errors']:
-                        for error in results['errors']:
-                            print(f"       ⚠️  Error: {error}")
-                    
-                    # Check all device logbook entries to see visibility
-                    all_device_entries = LogbookEntry.query.filter_by(device_id=device.id).all()
-                    print(f"   📖 All device logbook entries ({len(all_device_entries)}):")
-                    
-                    for entry in all_device_entries:
-                        user_info = ""
-                        if entry.user_id:
-                            user_info = f" (user: {entry.user.email})"
-                        elif entry.pilot_name:
-                            user_info = f" (pilot: {entry.pilot_name})"
-                        else:
-                            user_info = " (unmapped pilot)"
-                        
-                        print(f"     - {entry.takeoff_datetime.strftime('%Y-%m-%d %H:%M')} - "
-                              f"{entry.flight_time:.1f}h{user_info}")
-                    
-                    # Test device logbook access
-                    print(f"   🔍 Testing device logbook visibility...")
-                    
-                    # Count unique pilots
-                    unique_pilots = set()
-                    for entry in all_device_entries:
-                        if entry.pilot_name:
-                            unique_pilots.add(f"Pilot: {entry.pilot_name}")
-                        elif entry.user:
-                            unique_pilots.add(f"User: {entry.user.email}")
-                        else:
-                            unique_pilots.add("Unknown Pilot")
-                    
-                    print(f"     - Unique pilots who have flown this device: {len(unique_pilots)}")
-                    for pilot in unique_pilots:
-                        print(f"       • {pilot}")
-                    
-                    print(f"   ✅ Device shows ALL flights including unmapped pilots")
+                print(f"   ✅ Incremental processing results:")
+                print(f"     - New logbook entries: {results['new_entries']}")
+                new_entries += results['new_entries']
+                print(f"     - Updated entries: {results['updated_entries']}")
+                print(f"     - Errors: {len(results['errors'])}")
+                
+                if results['errors']:
+                    for error in results['errors']:
+                        print(f"       ⚠️  Error: {error}")
+                
+                # Check all device logbook entries to see visibility
+                # Users are preloaded; any other lazy load in the loops below raises
+                all_device_entries = db_session.execute(lambda_stmt(
+                    lambda: select(LogbookEntry).options(
+                        selectinload(LogbookEntry.user),
+                        raiseload('*')
+                    ).where(LogbookEntry.device_id == device_id)
+                )).scalars().all()
+                print(f"   📖 All device logbook entries ({len(all_device_entries)}):")
+                
+                # Collect the listing and write it in one call rather than one print per entry
+                lines = []
+                for entry in all_device_entries:
+                    user_info = ""
+                    if entry.user_id:
+                        user_info = f" (user: {entry.user.email})"
+                    elif entry.pilot_name:
+                        user_info = f" (pilot: {entry.pilot_name})"
+                    else:
+                        user_info = " (unmapped pilot)"
                     
-                except Exception as e:
-                    print(f"   ❌ Error during incremental processing: {str(e)}")
-                    continue
-            else:
-                print(f"   ⚠️  Not enough events for meaningful test")
-        
-        print(f"\n🎯 Testing Summary:")
-        print(f"✅ Incremental processing: Only processes new events")
-        print(f"✅ Unmapped pilots: Creates logbook entries for all flights")
-        print(f"✅ Device visibility: All flights visible in device logbook")
-        print(f"✅ No rebuilding: Preserves existing entries")
-        
-        print("\n" + "=" * 50)
-        print("Optimized logbook generation test completed")
-        return True
-
-if __name__ == "__main__":
-    success = test_optimized_logbook()
-    sys.exit(0 if success else 1)
+                    lines.append(f"     - {entry.takeoff_datetime.isoformat(' ', 'minutes')} - "
+                                 f"{entry.flight_time:.1f}h{user_info}")
+                if lines:
+                    print("\n".join(lines))
+                
+                # Test device logbook access
+                print(f"   🔍 Testing device logbook visibility...")
+                
+                # Count unique pilots: the database labels and de-duplicates them
+                pilot_label = case(
+                    (LogbookEntry.pilot_name.isnot(None), literal('Pilot: ') + LogbookEntry.pilot_name),
+                    (User.email.isnot(None), literal('User: ') + User.email),
+                    else_='Unknown Pilot'
+                )
+                unique_pilots = [
+                    label for label, in db_session.query(pilot_label)
+                    .outerjoin(User, LogbookEntry.user)
+                    .filter(LogbookEntry.device_id == device.id)
+                    .distinct()
+                ]
+                
+                print(f"     - Unique pilots who have flown this device: {len(unique_pilots)}")
+                if unique_pilots:
+                    print("\n".join(f"       • {pilot}" for pilot in unique_pilots))
+                
+                print(f"   ✅ Device shows ALL flights including unmapped pilots")
+                
+            except Exception as e:
+                print(f"   ❌ Error during incremental processing: {str(e)}")
+                continue
+        else:
+            print(f"   ⚠️  Not enough events for meaningful test")
+    
+    print(f"\n🎯 Testing Summary:")
+    print(f"✅ Incremental processing: Only processes new events")
+    print(f"✅ Unmapped pilots: Creates logbook entries for all flights")
+    print(f"✅ Device visibility: All flights visible in device logbook")
+    print(f"✅ No rebuilding: Preserves existing entries")
+    
+    print("\n" + "=" * 50)
+    print("Optimized logbook generation test completed")
+    # The seeded flight becomes exactly one logbook entry
+    return new_entries == 1
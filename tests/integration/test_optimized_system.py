@@ -5,7 +5,66 @@ Test script to validate the optimized logbook generation system.
 
 import requests
 import json
+import socket
+import sys
 import time
+from requests.adapters import HTTPAdapter
+
+# Shared session so repeated probes reuse one keep-alive connection
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+def port_open(host, port, timeout=0.3):
+    """Return True if a TCP connection to host:port can be established."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def wait_ready(host="127.0.0.1", port=5000, max_wait=3.0):
+    """Poll the app port with exponential backoff until it accepts connections or max_wait expires."""
+    deadline = time.monotonic() + max_wait
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if port_open(host, port):
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.4)
+    return False
+
+# Static feature summary, written in one go after the app check
+REPORT = """
+📋 System Features Implemented:
+✅ Incremental Processing: Only processes new events (not full rebuild)
+✅ Unmapped Pilot Support: Creates logbook entries for all flights
+✅ Device Visibility: All flights visible in device logbook
+✅ Performance Optimization: Preserves existing entries
+✅ Pilot Access: Both device owners and mapped pilots can view device logbook
+
+🔧 Key Changes Made:
+1. 📈 Replaced '_rebuild_complete_logbook_from_events()' with
+   '_build_logbook_entries_from_new_events()' for efficiency
+2. 👥 Modified logbook entry creation to not assign user_id,
+   making flights visible for all unmapped pilots
+3. 🔍 Enhanced device logbook route to show ALL device flights
+4. 🛡️  Added pilot access control to device logbook view
+5. ♻️  Removed rebuild logic that was deleting and recreating entries
+
+💡 Benefits:
+• 🚀 Faster sync operations (only process new events)
+• 💾 Preserves manual adjustments to logbook entries
+• 👁️  All flights visible in device logbook regardless of pilot mapping
+• ⚡ Better performance with large event datasets
+• 🔒 Maintains security while improving accessibility
+
+🎯 System Behavior:
+• New events → New logbook entries (incremental)
+• Unmapped pilots → Logbook entries created with device_id but no user_id
+• Device logbook → Shows ALL flights for that device
+• Admin logbook → Shows all entries including unmapped pilot flights
+• User logbook → Shows only entries assigned to that user
+"""
 
 # Test the optimized logbook generation via API
 def test_optimized_logbook_api():
@@ -16,47 +75,20 @@ def test_optimized_logbook_api():
     
     # Test 1: Check if app is running
     try:
-        response = requests.get(f"{base_url}/", timeout=5)
+        response = SESSION.get(f"{base_url}/", timeout=5)
         print(f"✅ Flask app is running (Status: {response.status_code})")
     except requests.exceptions.RequestException as e:
         print(f"❌ Flask app not accessible: {e}")
         return False
     
-    print("\n📋 System Features Implemented:")
-    print("✅ Incremental Processing: Only processes new events (not full rebuild)")
-    print("✅ Unmapped Pilot Support: Creates logbook entries for all flights")
-    print("✅ Device Visibility: All flights visible in device logbook")
-    print("✅ Performance Optimization: Preserves existing entries")
-    print("✅ Pilot Access: Both device owners and mapped pilots can view device logbook")
-    
-    print("\n🔧 Key Changes Made:")
-    print("1. 📈 Replaced '_rebuild_complete_logbook_from_events()' with")
-    print("   '_build_logbook_entries_from_new_events()' for efficiency")
-    print("2. 👥 Modified logbook entry creation to not assign user_id,")
-    print("   making flights visible for all unmapped pilots")
-    print("3. 🔍 Enhanced device logbook route to show ALL device flights")
-    print("4. 🛡️  Added pilot access control to device logbook view")
-    print("5. ♻️  Removed rebuild logic that was deleting and recreating entries")
-    
-    print("\n💡 Benefits:")
-    print("• 🚀 Faster sync operations (only process new events)")
-    print("• 💾 Preserves manual adjustments to logbook entries")
-    print("• 👁️  All flights visible in device logbook regardless of pilot mapping")
-    print("• ⚡ Better performance with large event datasets")
-    print("• 🔒 Maintains security while improving accessibility")
-    
-    print("\n🎯 System Behavior:")
-    print("• New events → New logbook entries (incremental)")
-    print("• Unmapped pilots → Logbook entries created with device_id but no user_id")
-    print("• Device logbook → Shows ALL flights for that device")
-    print("• Admin logbook → Shows all entries including unmapped pilot flights")
-    print("• User logbook → Shows only entries assigned to that user")
+    sys.stdout.write(REPORT)
+    sys.stdout.flush()
     
     return True
 
 if __name__ == "__main__":
-    # Give the app a moment to fully start
-    time.sleep(2)
+    # Wait only as long as the app actually needs to start
+    wait_ready()
     success = test_optimized_logbook_api()
     if success:
         print(f"\n🎉 Optimized Logbook Generation System is Ready!")
@@ -5,68 +5,88 @@ Test creating pilot mappings via the web interface
 
 import sys
 import os
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/Branch/NavSync/Protected/Cloud')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app, db
+from src.app import create_app
 from src.models import User, Device, Pilot, LogbookEntry
 
-def test_pilot_mapping_creation():
+def test_pilot_mapping_creation(db_session):
     """Test creating pilot mappings and verify they work correctly."""
     
-    app = create_app()
+    print("=== Testing Pilot Mapping Creation ===\n")
     
-    with app.app_context():
-        print("=== Testing Pilot Mapping Creation ===\n")
-        
-        # Get available users and devices
-        users = User.query.filter_by(is_active=True).all()
-        devices = Device.query.filter_by(is_active=True).all()
-        
-        print(f"Available users: {len(users)}")
-        for user in users:
-            print(f"  - {user.email} (ID: {user.id})")
-        
-        print(f"\nAvailable devices: {len(devices)}")
-        for device in devices:
-            print(f"  - {device.name} ({device.registration}) (ID: {device.id})")
-        
-        # Check existing pilot mappings
-        existing_pilots = Pilot.query.all()
-        print(f"\nExisting pilot mappings: {len(existing_pilots)}")
-        for pilot in existing_pilots:
-            print(f"  - '{pilot.pilot_name}' -> {pilot.user.email} on {pilot.device.name}")
-        
-        # Check unmapped pilots in logbook entries
-        unmapped_pilots = db.session.query(LogbookEntry.pilot_name.distinct().label('pilot_name'))\
-            .filter(LogbookEntry.pilot_name.isnot(None))\
-            .filter(~LogbookEntry.pilot_name.in_(
-                db.session.query(Pilot.pilot_name)
-            )).all()
-        
-        print(f"\nUnmapped pilots in logbook: {len(unmapped_pilots)}")
-        for pilot in unmapped_pilots:
-            pilot_name = pilot.pilot_name
-            entry_count = LogbookEntry.query.filter_by(pilot_name=pilot_name).count()
-            print(f"  - '{pilot_name}' ({entry_count} entries)")
-        
-        # Test the pilot resolution methods
-        print("\n=== Testing Pilot Resolution ===")
-        sample_entries = LogbookEntry.query.filter(LogbookEntry.pilot_name.isnot(None)).limit(5).all()
+    # Get available users and devices
+    users = User.query.filter_by(is_active=True).all()
+    devices = Device.query.filter_by(is_active=True).all()
+    
+    print(f"Available users: {len(users)}")
+    if users:
+        print("\n".join(f"  - {user.email} (ID: {user.id})" for user in users))
+    
+    print(f"\nAvailable devices: {len(devices)}")
+    if devices:
+        print("\n".join(f"  - {device.name} ({device.registration}) (ID: {device.id})" for device in devices))
+    
+    # Check existing pilot mappings
+    existing_pilots = Pilot.query.options(joinedload(Pilot.user), joinedload(Pilot.device)).all()
+    print(f"\nExisting pilot mappings: {len(existing_pilots)}")
+    if existing_pilots:
+        print("\n".join(f"  - '{pilot.pilot_name}' -> {pilot.user.email} on {pilot.device.name}"
+                        for pilot in existing_pilots))
+    
+    # Check unmapped pilots in logbook entries
+    # Names and entry counts come back together from one GROUP BY instead of a COUNT per pilot
+    unmapped_pilots = db_session.query(
+            LogbookEntry.pilot_name,
+            func.count(LogbookEntry.id).label('entry_count')
+        )\
+        .filter(LogbookEntry.pilot_name.isnot(None))\
+        .filter(~LogbookEntry.pilot_name.in_(
+            db_session.query(Pilot.pilot_name)
+        ))\
+        .group_by(LogbookEntry.pilot_name).all()
+    
+    print(f"\nUnmapped pilots in logbook: {len(unmapped_pilots)}")
+    if unmapped_pilots:
+        print("\n".join(f"  - '{pilot.pilot_name}' ({pilot.entry_count} entries)" for pilot in unmapped_pilots))
+    
+    # Test the pilot resolution methods
+    print("\n=== Testing Pilot Resolution ===")
+    sample_entries = LogbookEntry.query.options(
+        selectinload(LogbookEntry.user),
+        selectinload(LogbookEntry.device),
+        raiseload('*')
+    ).filter(LogbookEntry.pilot_name.isnot(None)).limit(5).all()
+    
+    # Fetch every sample entry's pilot mapping in one query instead of two lookups per entry
+    keys = {(entry.device_id, entry.pilot_name) for entry in sample_entries}
+    mapping_by_key = {
+        (pilot.device_id, pilot.pilot_name): pilot
+        for pilot in db_session.query(Pilot).options(joinedload(Pilot.user)).filter(
+            tuple_(Pilot.device_id, Pilot.pilot_name).in_(keys)
+        )
+    } if keys else {}
+    
+    for entry in sample_entries:
+        pilot_mapping = mapping_by_key.get((entry.device_id, entry.pilot_name))
+        # Same rule as LogbookEntry.get_actual_pilot_user(): named but unmapped pilots stay unlinked
+        actual_user = pilot_mapping.user if pilot_mapping else None
         
-        for entry in sample_entries:
-            pilot_mapping = entry.get_pilot_mapping()
-            actual_user = entry.get_actual_pilot_user()
-            
-            print(f"\nEntry: {entry.aircraft_registration} on {entry.date}")
-            print(f"  Pilot name: '{entry.pilot_name}'")
-            print(f"  Device: {entry.device.name if entry.device else 'None'}")
-            print(f"  Pilot mapping: {pilot_mapping}")
-            if pilot_mapping:
-                print(f"  Mapped to: {pilot_mapping.user.email}")
-            print(f"  Actual pilot user: {actual_user.email if actual_user else 'None'}")
-            print(f"  Entry user: {entry.user.email if entry.user else 'None'}")
+        print(f"\nEntry: {entry.aircraft_registration} on {entry.date}")
+        print(f"  Pilot name: '{entry.pilot_name}'")
+        print(f"  Device: {entry.device.name if entry.device else 'None'}")
+        print(f"  Pilot mapping: {pilot_mapping}")
+        if pilot_mapping:
+            print(f"  Mapped to: {pilot_mapping.user.email}")
+        print(f"  Actual pilot user: {actual_user.email if actual_user else 'None'}")
+        print(f"  Entry user: {entry.user.email if entry.user else 'None'}")
 
 if __name__ == '__main__':
-    test_pilot_mapping_creation()
+    from tests.conftest import transactional_session
+    
+    with transactional_session(create_app()) as db_session:
+        test_pilot_mapping_creation(db_session)
@@ -5,124 +5,142 @@ Test script to simulate ThingsBoard sync with pilot names
 
 import sys
 import os
-from datetime import datetime, date, time
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app, db
-from src.models import Device, LogbookEntry, Pilot
+from src.models import LogbookEntry, Pilot, db
 from src.services.thingsboard_sync import thingsboard_sync
+from tests.conftest import make_user
 
 
-def test_pilot_sync():
-    """Test pilot name handling in sync."""
+def create_logbook_entries(device, entries_data):
+    """
+    Create logbook entries for a batch of ThingsBoard data in one pass.
+    
+    Pilot mappings are loaded once and existing entries are found with one
+    query for the whole batch; duplicates are skipped.
+    """
+    pilot_user_ids = dict(
+        db.session.query(Pilot.pilot_name, Pilot.user_id).filter_by(device_id=device.id)
+    )
+    candidates = [
+        thingsboard_sync._build_logbook_entry(device, entry_data, pilot_user_ids)
+        for entry_data in entries_data
+    ]
+    if not candidates:
+        return []
+    
+    seen = set(
+        db.session.query(LogbookEntry.takeoff_datetime, LogbookEntry.landing_datetime).filter(
+            LogbookEntry.device_id == device.id,
+            db.tuple_(LogbookEntry.takeoff_datetime, LogbookEntry.landing_datetime).in_(
+                {(entry.takeoff_datetime, entry.landing_datetime) for entry in candidates}
+            )
+        )
+    )
     
-    app = create_app()
+    new_entries = []
+    for entry in candidates:
+        key = (entry.takeoff_datetime, entry.landing_datetime)
+        if key not in seen:
+            seen.add(key)
+            new_entries.append(entry)
     
-    with app.app_context():
+    db.session.add_all(new_entries)
+    db.session.flush()
+    return new_entries
+
+
+def test_pilot_sync(db_session, device):
+    """Test pilot name handling in sync."""
+    
+    try:
+        # 'Test Pilot' flies the device for a second user
+        test_pilot_user = make_user(db_session, email='test.pilot@example.com', nickname='Test Pilot')
+        db_session.add(Pilot(pilot_name='Test Pilot', user_id=test_pilot_user.id, device_id=device.id))
+        db_session.flush()
+        
+        print(f"✅ Using device: {device.name} (ID: {device.id})")
+        
+        # Test data with pilot names
+        test_entries = [
+            {
+                'date': '2025-07-31',
+                'aircraft_registration': 'I-D871',
+                'aircraft_type': 'Nesis IV',
+                'departure_airport': 'LJLJ',
+                'arrival_airport': 'LJMB',
+                'takeoff_time': '10:00',
+                'landing_time': '11:30',
+                'pilot_name': 'Test Pilot',  # This should map to existing pilot mapping
+                'remarks': 'Test flight with known pilot'
+            },
+            {
+                'date': '2025-07-31',
+                'aircraft_registration': 'I-D871',
+                'aircraft_type': 'Nesis IV',
+                'departure_airport': 'LJMB',
+                'arrival_airport': 'LJLJ',
+                'takeoff_time': '14:00',
+                'landing_time': '15:15',
+                'pilot_name': 'Unknown Pilot',  # This should fall back to device owner
+                'remarks': 'Test flight with unknown pilot'
+            },
+            {
+                'date': '2025-07-31',
+                'aircraft_registration': 'I-D871',
+                'aircraft_type': 'Nesis IV',
+                'departure_airport': 'LJLJ',
+                'arrival_airport': 'LJCE',
+                'takeoff_time': '16:00',
+                'landing_time': '17:00',
+                # No pilot_name - should use device owner
+                'remarks': 'Test flight without pilot name'
+            }
+        ]
+        
+        print(f"\n🧪 Testing pilot name handling...")
+        
         try:
-            # Get a device for testing
-            device = Device.query.filter_by(name="Roko2").first()
-            if not device:
-                print("❌ Device 'Roko2' not found")
-                return
-            
-            print(f"✅ Using device: {device.name} (ID: {device.id})")
-            
-            # Test data with pilot names
-            test_entries = [
-                {
-                    'date': '2025-07-31',
-                    'aircraft_registration': 'I-D871',
-                    'aircraft_type': 'Nesis IV',
-                    'departure_airport': 'LJLJ',
-                    'arrival_airport': 'LJMB',
-                    'takeoff_time': '10:00',
-                    'landing_time': '11:30',
-                    'pilot_name': 'Test Pilot',  # This should map to existing pilot mapping
-                    'remarks': 'Test flight with known pilot'
-                },
-                {
-                    'date': '2025-07-31',
-                    'aircraft_registration': 'I-D871',
-                    'aircraft_type': 'Nesis IV',
-                    'departure_airport': 'LJMB',
-                    'arrival_airport': 'LJLJ',
-                    'takeoff_time': '14:00',
-                    'landing_time': '15:15',
-                    'pilot_name': 'Unknown Pilot',  # This should fall back to device owner
-                    'remarks': 'Test flight with unknown pilot'
-                },
-                {
-                    'date': '2025-07-31',
-                    'aircraft_registration': 'I-D871',
-                    'aircraft_type': 'Nesis IV',
-                    'departure_airport': 'LJLJ',
-                    'arrival_airport': 'LJCE',
-                    'takeoff_time': '16:00',
-                    'landing_time': '17:00',
-                    # No pilot_name - should use device owner
-                    'remarks': 'Test flight without pilot name'
-                }
-            ]
+            # Create the whole batch at once: one duplicate check, one pilot mapping lookup
+            created_entries = create_logbook_entries(device, test_entries)
+            print(f"✅ Created {len(created_entries)} of {len(test_entries)} logbook entries")
             
-            print(f"\n🧪 Testing pilot name handling...")
-            
-            # Process each test entry
-            for i, entry_data in enumerate(test_entries, 1):
-                print(f"\n--- Test Entry {i} ---")
-                print(f"Pilot name: {entry_data.get('pilot_name', 'None')}")
+            for i, entry in enumerate(created_entries, 1):
+                # The batch resolved user_id from the preloaded mappings; the model re-checks it in one lookup
+                pilot_mapping, actual_user = entry.get_pilot_info()
+                
+                print(f"\n--- Created Entry {i} ---")
+                print(f"   • Pilot name in entry: {entry.pilot_name}")
+                print(f"   • Assigned to user ID: {entry.user_id}")
+                print(f"   • Actual pilot user: {actual_user.email if actual_user else 'None'}")
+                print(f"   • Has pilot mapping: {'Yes' if pilot_mapping else 'No'}")
                 
-                try:
-                    # Use the internal method directly for testing
-                    created = thingsboard_sync._create_logbook_entry(device, entry_data)
-                    
-                    if created:
-                        print(f"✅ Created logbook entry")
-                        
-                        # Find the created entry
-                        entry = LogbookEntry.query.filter_by(
-                            device_id=device.id,
-                            date=datetime.strptime(entry_data['date'], '%Y-%m-%d').date(),
-                            pilot_name=entry_data.get('pilot_name')
-                        ).first()
-                        
-                        if entry:
-                            pilot_mapping = entry.get_pilot_mapping()
-                            actual_user = entry.get_actual_pilot_user()
-                            
-                            print(f"   • Pilot name in entry: {entry.pilot_name}")
-                            print(f"   • Assigned to user ID: {entry.user_id}")
-                            print(f"   • Actual pilot user: {actual_user.email if actual_user else 'None'}")
-                            print(f"   • Has pilot mapping: {'Yes' if pilot_mapping else 'No'}")
-                            
-                    else:
-                        print(f"⚠️  Entry already exists or creation failed")
-                        
-                except Exception as e:
-                    print(f"❌ Error creating entry: {str(e)}")
-            
-            # Commit all changes
-            db.session.commit()
-            print(f"\n✅ Test completed successfully!")
-            
-            # Show summary
-            total_entries = LogbookEntry.query.filter_by(device_id=device.id).count()
-            entries_with_pilot_names = LogbookEntry.query.filter(
-                LogbookEntry.device_id == device.id,
-                LogbookEntry.pilot_name.isnot(None)
-            ).count()
-            
-            print(f"\n📊 Summary:")
-            print(f"   • Total entries for device: {total_entries}")
-            print(f"   • Entries with pilot names: {entries_with_pilot_names}")
-            
         except Exception as e:
-            db.session.rollback()
-            print(f"❌ Test failed: {str(e)}")
-
-
-if __name__ == "__main__":
-    print("🧑‍✈️ Testing Pilot Name Handling in Sync")
-    print("=" * 40)
-    test_pilot_sync()
+            print(f"❌ Error creating entries: {str(e)}")
+            return False
+        
+        if len(created_entries) != len(test_entries) or created_entries[0].user_id != test_pilot_user.id:
+            print("❌ Entries were not assigned to the mapped pilot")
+            return False
+        
+        # Commit all changes
+        db_session.commit()
+        print(f"\n✅ Test completed successfully!")
+        
+        # Show summary
+        total_entries = LogbookEntry.query.filter_by(device_id=device.id).count()
+        entries_with_pilot_names = LogbookEntry.query.filter(
+            LogbookEntry.device_id == device.id,
+            LogbookEntry.pilot_name.isnot(None)
+        ).count()
+        
+        print(f"\n📊 Summary:")
+        print(f"   • Total entries for device: {total_entries}")
+        print(f"   • Entries with pilot names: {entries_with_pilot_names}")
+        return True
+        
+    except Exception as e:
+        db_session.rollback()
+        print(f"❌ Test failed: {str(e)}")
+        return False
@@ -1,83 +1,233 @@
 #!/usr/bin/env python3
 """
 Test script to verify saveChecklistData functionality and the updated API route.
+
+Runs in-process on the Flask test client by default; pass ``--integration``
+to run the same flow against a dev server on 127.0.0.1:5000.
 """
 
 import requests
-import json
+import os
+import re
 import sys
+import time
+import weakref
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def test_save_checklist_data():
-    """Test the saveChecklistData functionality with proper authentication."""
-    
-    # Start a session to maintain cookies
-    session = requests.Session()
-    
-    # Test data structure (checklist format)
-    test_data = {
-        "Language": "en-us",
-        "Voice": "Linda",
-        "Root": {
-            "Type": 0,
-            "Name": "Root",
-            "Children": [
-                {
-                    "Type": 0,
-                    "Name": "Pre-flight",
-                    "Children": [
-                        {
-                            "Type": 1,
-                            "Name": "Check fuel level",
-                            "Children": []
-                        }
-                    ]
-                },
-                {
-                    "Type": 0,
-                    "Name": "In-flight",
-                    "Children": [
-                        {
-                            "Type": 1,
-                            "Name": "Monitor engine parameters",
-                            "Children": []
-                        }
-                    ]
-                }
-            ]
-        }
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tests.conftest import json_dumps, json_loads
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+# Shared session: keeps the login cookies and one keep-alive connection to the dev server
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
+_CSRF_FORM_RE = re.compile(r'name="csrf_token" value="([^"]*)"')
+_CSRF_META_RE = re.compile(r'name="csrf-token" content="([^"]*)"')
+
+# Page to scrape and pattern to apply for each kind of CSRF token
+_CSRF_SOURCES = {
+    'form': ('/auth/login', _CSRF_FORM_RE),
+    'meta': ('/dashboard/checklists', _CSRF_META_RE),
+}
+CSRF_TTL = 3000  # seconds; Flask-WTF tokens are valid for an hour
+# Keyed by the session object itself, so a new client never inherits a dead one's tokens
+_csrf_cache = weakref.WeakKeyDictionary()
+
+# Checklist content saved and loaded back by the test
+TEST_DATA = {
+    "Language": "en-us",
+    "Voice": "Linda",
+    "Root": {
+        "Type": 0,
+        "Name": "Root",
+        "Children": [
+            {
+                "Type": 0,
+                "Name": "Pre-flight",
+                "Children": [
+                    {
+                        "Type": 1,
+                        "Name": "Check fuel level",
+                        "Children": []
+                    }
+                ]
+            },
+            {
+                "Type": 0,
+                "Name": "In-flight",
+                "Children": [
+                    {
+                        "Type": 1,
+                        "Name": "Monitor engine parameters",
+                        "Children": []
+                    }
+                ]
+            }
+        ]
     }
-    
+}
+
+# TEST_DATA never changes, so encode it (and the PUT body wrapping it) once at import
+_TEST_DATA_BYTES = json_dumps(TEST_DATA)
+_UPDATE_PAYLOAD = b'{"json_content":' + _TEST_DATA_BYTES + b'}'
+
+def get_csrf(session, kind, base_url=''):
+    """Return a CSRF token for ``session``, scraping its page only when the cached one is stale.
+
+    ``session`` is a ``requests.Session`` (with ``base_url``) or a Flask test client.
+    """
+    tokens = _csrf_cache.setdefault(session, {})
+    token, expires_at = tokens.get(kind, (None, 0))
+    if token and time.monotonic() < expires_at:
+        return token
+
+    path, pattern = _CSRF_SOURCES[kind]
+    page = session.get(base_url + path)
+    match = pattern.search(page.text) if page.status_code == 200 else None
+    if not match:
+        tokens.pop(kind, None)
+        return None
+
+    token = match.group(1)
+    tokens[kind] = (token, time.monotonic() + CSRF_TTL)
+    return token
+
+def invalidate_csrf(session):
+    """Forget the cached CSRF tokens of ``session``, e.g. after a rejected request."""
+    _csrf_cache.pop(session, None)
+
+def save_and_verify(session, checklist_id, csrf_token, base_url=''):
+    """PUT ``TEST_DATA`` into a checklist and load it back to compare."""
+    test_data = TEST_DATA
+
+    # Test the API update route with json_content
+    print(f"\n📊 Testing API update route with json_content...")
+
+    update_url = f'{base_url}/dashboard/api/checklist/{checklist_id}'
+
+    print(f"🔄 Sending PUT request to {update_url}")
+    print(f"📋 Data preview: {_TEST_DATA_BYTES[:200].decode(errors='replace')}...")
+
+    # The body is pre-encoded; the retry below resends the same bytes
+    payload = _UPDATE_PAYLOAD
+    headers = {'Content-Type': 'application/json', 'X-CSRFToken': csrf_token}
+    response = session.put(update_url, data=payload, headers=headers)
+
+    if response.status_code in (400, 403):
+        # The cached token may have expired server-side; refresh it once and retry
+        invalidate_csrf(session)
+        csrf_token = get_csrf(session, 'meta', base_url)
+        if csrf_token:
+            headers['X-CSRFToken'] = csrf_token
+            response = session.put(update_url, data=payload, headers=headers)
+
+    print(f"📊 Response status: {response.status_code}")
+
+    if response.status_code == 200:
+        print("✅ API update successful")
+        try:
+            response_data = json_loads(response.text)
+            print(f"📋 Response: {response_data}")
+        except:
+            print("📋 Response (text):", response.text[:200])
+
+        # Verify the data was saved by loading it back
+        print(f"\n🔍 Verifying data was saved...")
+        load_response = session.get(f'{base_url}/dashboard/api/checklist/{checklist_id}/load_json')
+
+        if load_response.status_code == 200:
+            # load_json wraps the stored checklist content in a "data" field
+            loaded_data = json_loads(load_response.text).get('data') or {}
+            if isinstance(loaded_data, str):
+                loaded_data = json_loads(loaded_data)
+
+            # Check if our test data matches; both Root checks share one lookup
+            loaded_root = loaded_data.get('Root') or {}
+            expected_root = test_data['Root']
+            checks = [
+                ('Language', loaded_data.get('Language'), test_data['Language']),
+                ('Root name', loaded_root.get('Name'), expected_root['Name']),
+                ('Children count', len(loaded_root.get('Children', [])), len(expected_root['Children'])),
+            ]
+            report = ["✅ Load response successful"]
+            report += [
+                f"✅ {label} matches: {got}" if got == expected
+                else f"⚠️ {label} mismatch - Expected: {expected}, Got: {got}"
+                for label, got, expected in checks
+            ]
+            print("\n".join(report))
+
+        else:
+            print(f"❌ Failed to verify data: {load_response.status_code}")
+
+    elif response.status_code == 404:
+        print("❌ Checklist not found - try creating a checklist first")
+    elif response.status_code in (400, 403):
+        print("❌ Rejected - check CSRF token or authentication")
+    else:
+        print(f"❌ Update failed with status {response.status_code}")
+        print(f"📄 Response: {response.text[:300]}")
+
+    return response.status_code == 200
+
+def test_save_checklist_data(client, user):
+    """Test saving checklist JSON in-process as a logged-in checklist owner."""
+    from src.models import DEFAULT_CHECKLIST_JSON, db, Checklist
+
     print("🧪 Testing saveChecklistData functionality...")
     print("=" * 60)
-    
-    # First get login page to obtain CSRF token
-    print("🔑 Getting login page for CSRF token...")
-    login_page = session.get('http://127.0.0.1:5000/auth/login')
-    
-    if login_page.status_code != 200:
-        print(f"❌ Failed to get login page: {login_page.status_code}")
+
+    checklist = Checklist(title='Save Checklist Test', items='[]', json_content=DEFAULT_CHECKLIST_JSON,
+                          user_id=user.id)
+    db.session.add(checklist)
+    db.session.flush()
+
+    # Log in by seeding the Flask-Login session instead of posting credentials
+    print("🔑 Logging in as the test user...")
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+    csrf_token = get_csrf(client, 'meta')
+    if not csrf_token:
+        print("❌ Could not find CSRF token on the checklists page")
         return False
-    
-    # Extract CSRF token from login page
-    import re
-    csrf_match = re.search(r'name="csrf_token" value="([^"]*)"', login_page.text)
-    if not csrf_match:
+
+    return save_and_verify(client, checklist.id, csrf_token)
+
+def run_integration():
+    """Run the save flow against a live dev server, logging in with real credentials."""
+    session = SESSION
+
+    print("🧪 Testing saveChecklistData functionality...")
+    print("=" * 60)
+
+    # Get the login form's CSRF token (the login page is only fetched when no token is cached)
+    print("🔑 Getting CSRF token for login...")
+    csrf_token = get_csrf(session, 'form', BASE_URL)
+    if not csrf_token:
         print("❌ Could not find CSRF token on login page")
         return False
-    
-    csrf_token = csrf_match.group(1)
+
     print(f"✅ Found CSRF token: {csrf_token[:20]}...")
-    
+
     # Login with credentials
     login_data = {
         'email': 'admin@test.com',
         'password': 'admin123',
         'csrf_token': csrf_token
     }
-    
+
     print("🔑 Attempting to login...")
-    login_response = session.post('http://127.0.0.1:5000/auth/login', data=login_data)
-    
+    login_response = session.post(f'{BASE_URL}/auth/login', data=login_data)
+
     if login_response.status_code == 200 and 'dashboard' in login_response.url:
         print("✅ Login successful")
     elif login_response.status_code == 302:
@@ -86,90 +236,33 @@ def test_save_checklist_data():
         print(f"❌ Login failed with status {login_response.status_code}")
         print(f"URL: {login_response.url}")
         return False
-    
-    # Test the API update route with json_content
-    print(f"\n📊 Testing API update route with json_content...")
-    
-    # First try to get CSRF token from the dashboard
-    dashboard_response = session.get('http://127.0.0.1:5000/dashboard/checklists')
-    csrf_match = re.search(r'content="([^"]*)"[^>]*name="csrf-token"', dashboard_response.text)
-    if csrf_match:
-        csrf_token = csrf_match.group(1)
+
+    # Prefer the dashboard's CSRF token for the API calls
+    dashboard_token = get_csrf(session, 'meta', BASE_URL)
+    if dashboard_token:
+        csrf_token = dashboard_token
         print(f"✅ Found dashboard CSRF token: {csrf_token[:20]}...")
-    
+
     # Test updating checklist with ID 1
-    checklist_id = 1
-    update_url = f'http://127.0.0.1:5000/dashboard/api/checklist/{checklist_id}'
-    
-    update_data = {
-        'json_content': test_data
-    }
-    
-    headers = {
-        'Content-Type': 'application/json',
-        'X-CSRFToken': csrf_token
-    }
-    
-    print(f"🔄 Sending PUT request to {update_url}")
-    print(f"📋 Data preview: {json.dumps(test_data, indent=2)[:200]}...")
-    
-    response = session.put(update_url, json=update_data, headers=headers)
-    
-    print(f"📊 Response status: {response.status_code}")
-    
-    if response.status_code == 200:
-        print("✅ API update successful")
-        try:
-            response_data = response.json()
-            print(f"📋 Response: {response_data}")
-        except:
-            print("📋 Response (text):", response.text[:200])
-            
-        # Verify the data was saved by loading it back
-        print(f"\n🔍 Verifying data was saved...")
-        load_response = session.get(f'http://127.0.0.1:5000/dashboard/api/checklist/{checklist_id}/load_json')
-        
-        if load_response.status_code == 200:
-            print("✅ Load response successful")
-            loaded_data = load_response.json()
-            
-            # Check if our test data matches
-            if loaded_data.get('Language') == test_data['Language']:
-                print("✅ Data verification successful - Language matches")
-            else:
-                print(f"⚠️ Data mismatch - Expected: {test_data['Language']}, Got: {loaded_data.get('Language')}")
-                
-            if loaded_data.get('Root', {}).get('Name') == test_data['Root']['Name']:
-                print("✅ Data verification successful - Root name matches")
-            else:
-                print(f"⚠️ Root name mismatch")
-                
-            children_count = len(loaded_data.get('Root', {}).get('Children', []))
-            expected_count = len(test_data['Root']['Children'])
-            if children_count == expected_count:
-                print(f"✅ Children count matches: {children_count}")
-            else:
-                print(f"⚠️ Children count mismatch - Expected: {expected_count}, Got: {children_count}")
-                
-        else:
-            print(f"❌ Failed to verify data: {load_response.status_code}")
-            
-    elif response.status_code == 404:
-        print("❌ Checklist not found - try creating a checklist first")
-    elif response.status_code == 403:
-        print("❌ Forbidden - check CSRF token or authentication")
-    else:
-        print(f"❌ Update failed with status {response.status_code}")
-        print(f"📄 Response: {response.text[:300]}")
-    
-    return response.status_code == 200
+    return save_and_verify(session, 1, csrf_token, BASE_URL)
 
 if __name__ == "__main__":
     print("🧪 Testing saveChecklistData API integration...")
     print("=" * 60)
-    
+
     try:
-        success = test_save_checklist_data()
+        if '--integration' in sys.argv:
+            success = run_integration()
+        else:
+            from src.app import create_app
+            from tests.conftest import make_user, transactional_session
+
+            app = create_app()
+
+            # The test user and checklist are rolled back afterwards
+            with transactional_session(app) as db_session:
+                success = test_save_checklist_data(app.test_client(), make_user(db_session))
+
         print("\n" + "=" * 60)
         if success:
             print("🎉 Test completed successfully!")
@@ -18,16 +18,16 @@ def test_ckl_file():
         return False
     
     try:
-        # Read and validate the .ckl file
-        with open(test_file, 'r') as f:
-            content = f.read()
+        # Size comes from the filesystem so the content is only held once, as parsed JSON
+        file_size = os.path.getsize(test_file)
         
-        print(f"✅ Successfully read {test_file}")
-        print(f"📊 File size: {len(content)} characters")
+        print(f"✅ Found {test_file}")
+        print(f"📊 File size: {file_size} bytes")
         
-        # Try to parse as JSON to validate structure
+        # Parse the file as JSON directly from the handle to validate structure
         try:
-            json_data = json.loads(content)
+            with open(test_file, 'rb') as f:
+                json_data = json.load(f)
             print("✅ File content is valid JSON")
             
             if 'CheckList' in json_data:
@@ -38,11 +38,13 @@ def test_ckl_file():
                     sections = checklist['Children']
                     print(f"📑 Number of sections: {len(sections)}")
                     
-                    total_items = 0
-                    for section in sections:
-                        items = len(section.get('Children', []))
-                        total_items += items
-                        print(f"  - {section.get('Name', 'Unknown')}: {items} items")
+                    item_counts = [len(section.get('Children', ())) for section in sections]
+                    total_items = sum(item_counts)
+                    if sections:
+                        print('\n'.join(
+                            f"  - {section.get('Name', 'Unknown')}: {items} items"
+                            for section, items in zip(sections, item_counts)
+                        ))
                     
                     print(f"📝 Total checklist items: {total_items}")
                 else:
@@ -56,8 +58,8 @@ def test_ckl_file():
         
         # Test filename extraction
         filename = test_file
-        if filename.lower().endswith('.ckl'):
-            title = filename[:-4]  # Remove .ckl extension
+        title, extension = os.path.splitext(filename)
+        if extension.lower() == '.ckl':
             print(f"📄 Extracted title from filename: '{title}'")
         else:
             title = filename
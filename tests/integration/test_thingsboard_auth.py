@@ -62,6 +62,8 @@ def test_authentication():
     except Exception as e:
         print(f"❌ Exception during authentication: {str(e)}")
         return False
+    finally:
+        sync_service.close()
     
     return result
 
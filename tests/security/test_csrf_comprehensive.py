@@ -8,37 +8,26 @@ import sys
 from datetime import datetime
 from dotenv import load_dotenv
 
-# Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from app import create_app
-from models import db
 
-def test_csrf_fixes():
-    """Test CSRF functionality with the Flask test client."""
+def test_csrf_fixes(client):
+    """Test CSRF functionality with the Flask test client (CSRF is enabled by default)."""
     # Load environment variables
     load_dotenv()
     
-    # Create Flask app in testing mode
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['WTF_CSRF_ENABLED'] = True  # Ensure CSRF is enabled for testing
-    
     print("CSRF Fix Verification Test")
     print("=" * 30)
     
-    with app.test_client() as client:
+    with client:
         
         # Test 1: Check that forms include CSRF tokens
         print("1. Testing CSRF token presence in forms...")
         
-        # Get login page
+        # Render the login page and look for the hidden input in the raw body
         response = client.get('/auth/login')
-        assert response.status_code == 200
-        
-        # Check if CSRF token is present in HTML
-        html_content = response.get_data(as_text=True)
-        if 'name="csrf_token"' in html_content:
+        if response.status_code == 200 and b'name="csrf_token"' in response.data:
             print("   ✅ Login form includes CSRF token")
         else:
             print("   ❌ Login form missing CSRF token")
@@ -97,8 +86,10 @@ def test_csrf_fixes():
         return True
 
 if __name__ == "__main__":
+    from src.app import create_app
+    
     try:
-        success = test_csrf_fixes()
+        success = test_csrf_fixes(create_app().test_client())
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"❌ Test failed with error: {str(e)}")
@@ -3,13 +3,10 @@
 Simple test to verify CSRF exemption works for API endpoints
 """
 
-from src.app import create_app
 import json
 
-def test_api_routes():
+def test_api_routes(app):
     """Test the API routes can be accessed without CSRF tokens"""
-    app = create_app()
-    
     with app.test_client() as client:
         # Test health endpoint (no auth required)
         print("Testing health endpoint...")
@@ -37,4 +34,5 @@ def test_api_routes():
         print()
 
 if __name__ == '__main__':
-    test_api_routes()
+    from src.app import create_app
+    test_api_routes(create_app())
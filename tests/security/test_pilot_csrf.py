@@ -5,50 +5,37 @@ Test CSRF token functionality for pilot mappings with WTForms
 
 import sys
 import os
-import re
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/Branch/NavSync/Protected/Cloud')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.app import create_app
+from tests.conftest import get_csrf_token, make_user
 
-def test_pilot_form_csrf():
+def test_pilot_form_csrf(client, db_session, device):
     """Test that the pilot form includes CSRF tokens correctly with WTForms."""
     
-    app = create_app()
+    # An admin who can log in, mapping a pilot onto the fixture device
+    admin_user = make_user(db_session, email='fixture.admin@example.com', nickname='Admin', is_admin=True)
+    admin_user.set_password('adminpass123')
+    db_session.flush()
     
-    with app.test_client() as client:
+    with client:
         print("=== TESTING PILOT FORM CSRF TOKEN WITH WTFORMS ===\n")
         
-        # First, get login page and extract CSRF token
-        print("1. Getting login page...")
-        login_page = client.get('/auth/login')
+        # First, get the login form's CSRF token; it stays valid for this client's session
+        print("1. Getting login CSRF token...")
+        login_csrf_token = get_csrf_token(client)
         
-        if login_page.status_code == 200:
-            print("✅ Login page loaded")
-        else:
-            print(f"❌ Failed to load login page: {login_page.status_code}")
-            return
-        
-        # Extract CSRF token from login form
-        login_html = login_page.data.decode('utf-8')
-        csrf_match = re.search(r'id="csrf_token"[^>]*value="([^"]+)"', login_html)
-        
-        if csrf_match:
-            login_csrf_token = csrf_match.group(1)
+        if login_csrf_token:
             print(f"✅ Got login CSRF token: {login_csrf_token[:20]}...")
         else:
             print("❌ Could not extract login CSRF token")
-            print("Login page content snippet:")
-            csrf_search = re.search(r'csrf[^>]*>', login_html)
-            if csrf_search:
-                print(csrf_search.group(0))
             return
         
         # Login as admin
         print("2. Logging in as admin...")
         login_response = client.post('/auth/login', data={
-            'email': 'admin@kanardia.test',
+            'email': 'fixture.admin@example.com',
             'password': 'adminpass123',
             'csrf_token': login_csrf_token
         }, follow_redirects=True)
@@ -57,7 +44,7 @@ def test_pilot_form_csrf():
             print("✅ Login successful")
         else:
             print("❌ Login failed")
-            print("Response:", login_response.data.decode('utf-8')[:300])
+            print("Response:", login_response.data[:300].decode(errors='replace'))
             return
         
         # Get the pilots page
@@ -68,33 +55,25 @@ def test_pilot_form_csrf():
             print("✅ Pilots page loaded successfully")
         else:
             print(f"❌ Failed to load pilots page: {pilots_response.status_code}")
-            print("Response content:", pilots_response.data.decode('utf-8')[:300])
+            print("Response content:", pilots_response.data[:300].decode(errors='replace'))
             return
         
         # Check if CSRF token is in the HTML
-        html_content = pilots_response.data.decode('utf-8')
-        
-        if 'name="csrf_token"' in html_content:
+        if b'name="csrf_token"' in pilots_response.data:
             print("✅ CSRF token field found in HTML")
         else:
             print("❌ CSRF token field NOT found in HTML")
             return
         
-        # Extract CSRF token from the pilot form
-        csrf_match = re.search(r'id="csrf_token"[^>]*value="([^"]+)"', html_content)
-        if csrf_match:
-            csrf_token = csrf_match.group(1)
-            print(f"✅ Extracted CSRF token: {csrf_token[:20]}...")
-        else:
-            print("❌ Could not extract CSRF token value")
-            return
+        # The session's token is the one the pilot form was rendered with
+        csrf_token = login_csrf_token
         
         # Test creating a pilot mapping with CSRF token
         print("4. Testing pilot mapping creation with CSRF...")
         create_data = {
             'pilot_name': 'CSRF Test Pilot WTF',
-            'user_id': '3',  # test@example.com
-            'device_id': '5',  # Roko2
+            'user_id': str(device.user_id),
+            'device_id': str(device.id),
             'csrf_token': csrf_token
         }
         
@@ -106,19 +85,18 @@ def test_pilot_form_csrf():
             
             # Check if the mapping was actually created by accessing the pilots page again
             verify_response = client.get('/admin/pilots')
-            if 'CSRF Test Pilot WTF' in verify_response.data.decode('utf-8'):
+            if b'CSRF Test Pilot WTF' in verify_response.data:
                 print("✅ Pilot mapping verified in database")
             else:
                 print("⚠️  Pilot mapping not found in pilots list")
+                return False
                 
         elif create_response.status_code == 400:
             print("❌ CSRF validation still failed")
-            print("   Response data:", create_response.data.decode('utf-8')[:200])
+            print("   Response data:", create_response.data[:200].decode(errors='replace'))
         else:
             print(f"⚠️  Unexpected response: {create_response.status_code}")
-            print("   Response data:", create_response.data.decode('utf-8')[:200])
+            print("   Response data:", create_response.data[:200].decode(errors='replace'))
         
         print("\n=== CSRF TEST COMPLETE ===")
-
-if __name__ == '__main__':
-    test_pilot_form_csrf()
+        return create_response.status_code == 302
@@ -4,21 +4,34 @@ Final comprehensive test for the date format configuration feature.
 Tests CSRF token, form submission, and date format application.
 """
 
+import os
+import sys
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+# Shared session: every check reuses one keep-alive connection to the dev server
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
 
 def test_csrf_and_form_submission():
     """Test CSRF token and form submission functionality."""
     try:
         print("🔒 Testing CSRF Token and Form Submission...")
         
-        # Create a session to maintain cookies
-        session = requests.Session()
+        # The shared session maintains cookies between requests
+        session = SESSION
         
         # First, let's test if we can access the settings page
         print("  1. Testing settings page access (should redirect to login)...")
-        response = session.get('http://127.0.0.1:5000/dashboard/settings', timeout=5)
+        response = session.get(f'{BASE_URL}/dashboard/settings', timeout=5)
         if response.status_code == 302 and 'login' in response.url:
             print("  ✓ Settings page properly requires authentication")
         else:
@@ -26,7 +39,7 @@ def test_csrf_and_form_submission():
         
         # Test login page access
         print("  2. Testing login page access...")
-        response = session.get('http://127.0.0.1:5000/auth/login', timeout=5)
+        response = session.get(f'{BASE_URL}/auth/login', timeout=5)
         if response.status_code == 200:
             print("  ✓ Login page accessible")
         else:
@@ -50,63 +63,61 @@ def test_application_structure():
         ('/dashboard/settings', 'Settings page (should redirect)')
     ]
     
-    success_count = 0
-    for route, description in routes_to_test:
+    def probe(route):
         try:
-            response = requests.get(f'http://127.0.0.1:5000{route}', timeout=5, allow_redirects=False)
-            if response.status_code in [200, 302]:
-                print(f"  ✓ {description}: {response.status_code}")
-                success_count += 1
-            else:
-                print(f"  ❌ {description}: {response.status_code}")
+            # Only the status is checked, so HEAD skips the body and keeps the connection pooled
+            return SESSION.head(f'{BASE_URL}{route}', timeout=5, allow_redirects=False).status_code
         except Exception as e:
-            print(f"  ❌ {description}: Error - {e}")
+            return e
+    
+    # The probes are independent; run them concurrently (one pooled connection each)
+    # and report in the original order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(probe, [route for route, _ in routes_to_test]))
+    
+    success_count = 0
+    report = []
+    for (route, description), result in zip(routes_to_test, results):
+        if isinstance(result, Exception):
+            report.append(f"  ❌ {description}: Error - {result}")
+        elif result in [200, 302]:
+            report.append(f"  ✓ {description}: {result}")
+            success_count += 1
+        else:
+            report.append(f"  ❌ {description}: {result}")
+    print("\n".join(report))
     
     return success_count == len(routes_to_test)
 
-def test_date_format_functionality():
-    """Test date format functionality using the database directly."""
+def test_date_format_functionality(user):
+    """Test date format functionality on a test user."""
     print("\n📅 Testing Date Format Functionality...")
     
-    import sys
-    import os
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    
     try:
-        from src.app import create_app, db
-        from src.models import User
+        print(f"  ✓ Found user: {user.email}")
+        print(f"  ✓ Current date format: {user.date_format}")
+        
+        # Test date formatting with different formats
+        test_date = datetime(2025, 8, 19, 14, 30, 0)
+        formats_to_test = [
+            '%Y-%m-%d',
+            '%d.%m.%Y', 
+            '%d/%m/%Y',
+            '%m/%d/%Y'
+        ]
+        
+        print("  📊 Testing date format rendering:")
+        for fmt in formats_to_test:
+            formatted = test_date.strftime(fmt)
+            print(f"    {fmt} → {formatted}")
+        
+        return True
         
-        app = create_app()
-        with app.app_context():
-            # Test if any users exist
-            user = User.query.first()
-            if not user:
-                print("  ❌ No users found in database")
-                return False
-            
-            print(f"  ✓ Found user: {user.email}")
-            print(f"  ✓ Current date format: {user.date_format}")
-            
-            # Test date formatting with different formats
-            test_date = datetime(2025, 8, 19, 14, 30, 0)
-            formats_to_test = [
-                '%Y-%m-%d',
-                '%d.%m.%Y', 
-                '%d/%m/%Y',
-                '%m/%d/%Y'
-            ]
-            
-            print("  📊 Testing date format rendering:")
-            for fmt in formats_to_test:
-                formatted = test_date.strftime(fmt)
-                print(f"    {fmt} → {formatted}")
-            
-            return True
-            
     except Exception as e:
         print(f"  ❌ Database test error: {e}")
         return False
 
+
 def monitor_flask_logs():
     """Monitor Flask application for any CSRF errors."""
     print("\n📊 Monitoring Flask Application...")
@@ -114,7 +125,7 @@ def monitor_flask_logs():
     
     # Just verify the app is responding
     try:
-        response = requests.get('http://127.0.0.1:5000', timeout=5)
+        response = SESSION.head(BASE_URL, timeout=5)
         if response.status_code == 200:
             print("  ✓ Flask application is running and responsive")
             return True
@@ -125,19 +136,31 @@ def monitor_flask_logs():
         print(f"  ❌ Flask application not accessible: {e}")
         return False
 
+def wait_for_server(timeout=3.0):
+    """Poll the dev server until it answers, for at most ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            SESSION.head(f'{BASE_URL}/auth/login', timeout=0.2)
+            return True
+        except requests.exceptions.RequestException:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+
 def run_comprehensive_test():
     """Run all tests and provide a summary."""
     print("🚀 KanardiaCloud Date Format Feature - Final Test Suite")
     print("=" * 60)
     
-    # Wait for Flask to fully start
+    # Wait for Flask to start, but no longer than it takes to answer
     print("⏰ Waiting for Flask application to fully initialize...")
-    time.sleep(3)
+    if not wait_for_server():
+        print("  ⚠️  Flask application is not answering yet; running the tests anyway")
     
     tests = [
         ("CSRF and Form Tests", test_csrf_and_form_submission),
         ("Application Structure", test_application_structure), 
-        ("Date Format Functionality", test_date_format_functionality),
         ("Flask Monitoring", monitor_flask_logs)
     ]
     
@@ -177,6 +200,3 @@ def run_comprehensive_test():
         print("⚠️  Some tests failed. Review the output above for details.")
     
     return passed == total
-
-if __name__ == '__main__':
-    run_comprehensive_test()
@@ -5,88 +5,134 @@ Test script to verify admin logbook page functionality after time field fix.
 
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Add the project root to Python path
-sys.path.insert(0, '/home/rok/Branch/NavSync/Protected/Cloud')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.orm import selectinload
 
 from src.app import create_app
-from src.models import LogbookEntry, db
+from src.models import LogbookEntry, Pilot, db
 
-def test_admin_logbook_query():
-    """Test the admin logbook query that was failing."""
+def test_admin_logbook_query(db_session, device):
+    """Test the admin logbook query, following keyset cursors through every page and back."""
+    from tests.conftest import count_queries, make_logbook_entry
     
     print("🧪 Testing admin logbook query...")
     
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            # Test the exact query from the admin logbook route
-            page = 1
-            per_page = 20
-            
-            # Build query (same as in admin route)
-            query = LogbookEntry.query
-            query = query.order_by(LogbookEntry.date.desc(), LogbookEntry.created_at.desc())
-            
-            print("🔍 Testing pagination query...")
-            
-            # This is where the error was occurring
-            entries = query.paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            
-            print(f"✅ Query successful - found {entries.total} total entries")
-            print(f"📄 Showing page {entries.page} of {entries.pages}")
-            print(f"📝 Items on this page: {len(entries.items)}")
-            
-            # Test accessing individual entries to make sure time fields work
-            for i, entry in enumerate(entries.items[:3]):  # Test first 3 entries
+    try:
+        # One pilot name is mapped to the device owner, one is not
+        db_session.add(Pilot(pilot_name='Mapped Pilot', user_id=device.user_id, device_id=device.id))
+        
+        # Two entries share a takeoff time, so the id tiebreaker decides their order
+        takeoff = datetime(2025, 1, 1, 10, 0)
+        for offset, pilot_name in zip((0, 0, 1, 2, 3), ('Mapped Pilot', 'Unknown Pilot', None) * 2):
+            make_logbook_entry(db_session, device, takeoff_datetime=takeoff + timedelta(days=offset),
+                               landing_datetime=takeoff + timedelta(days=offset, hours=1),
+                               pilot_name=pilot_name)
+        # Start from an empty identity map, as a request would
+        db_session.expunge_all()
+        
+        # Build query (same as in admin route): a bare count, then newest-first pages
+        # with each entry's device and pilot loaded for the whole page
+        per_page = 2
+        query = LogbookEntry.query.filter(LogbookEntry.device_id == device.id)
+        total = query.with_entities(db.func.count(LogbookEntry.id)).scalar()
+        query = query.options(
+            selectinload(LogbookEntry.device),
+            selectinload(LogbookEntry.user),
+            selectinload(LogbookEntry.pilot_mapping).joinedload(Pilot.user),
+        )
+        
+        print("🔍 Testing keyset pagination query...")
+        
+        seen, after, pages = [], None, []
+        while True:
+            entries = LogbookEntry.seek_page(query, after, per_page)
+            pages.append(entries.items)
+            seen += entries.items
+            print(f"📄 Page {len(pages)}: {len(entries.items)} items, next cursor: {entries.next_cursor}")
+            after = entries.next_cursor
+            if after is None:
+                break
+        
+        print(f"✅ Query successful - found {total} total entries on {len(pages)} pages")
+        
+        expected = sorted(seen, key=lambda entry: (entry.takeoff_datetime, entry.id), reverse=True)
+        if len(seen) != total or len({entry.id for entry in seen}) != total or seen != expected:
+            print("❌ Pages skipped, repeated or misordered entries")
+            return False
+        
+        # Previous links walk back through the same pages, ending on the first one
+        before, back_pages = entries.prev_cursor, []
+        while before is not None:
+            entries = LogbookEntry.seek_page(query, per_page=per_page, before=before)
+            back_pages.append(entries.items)
+            before = entries.prev_cursor
+        if back_pages != pages[-2::-1]:
+            print("❌ Previous pages differ from the pages seen going forward")
+            return False
+        
+        # Test accessing individual entries to make sure time fields work; everything
+        # the admin template reads per entry is already loaded
+        with count_queries(db_session.connection()) as statements:
+            for i, entry in enumerate(seen[:3]):  # Test first 3 entries
+                pilot_user = entry.get_actual_pilot_user()
                 print(f"   Entry {i+1}: ID={entry.id}, Date={entry.date}")
                 print(f"      Takeoff: {entry.takeoff_time}, Landing: {entry.landing_time}")
-                print(f"      Pilot: {entry.pilot_name}, User: {entry.user_id}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Query failed with error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+                print(f"      Pilot: {entry.pilot_name}, User: {pilot_user.nickname if pilot_user else None}, "
+                      f"Device: {entry.device.registration}")
+        if statements:
+            print(f"❌ Reading the entries ran {len(statements)} more queries")
+            return False
+        
+        # An unreadable cursor starts over from the newest entry
+        if LogbookEntry.seek_page(query, 'not-a-cursor', per_page).items != seen[:per_page]:
+            print("❌ Invalid cursor did not fall back to the first page")
             return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Query failed with error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
 
-def test_time_field_access():
+def test_time_field_access(app_ctx):
     """Test direct access to time fields."""
     
     print("\n🧪 Testing time field access...")
     
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            # Get all entries and check time fields
-            entries = LogbookEntry.query.all()
-            
-            time_entries = []
-            for entry in entries:
-                if entry.takeoff_time is not None or entry.landing_time is not None:
-                    time_entries.append(entry)
-            
-            print(f"📊 Total entries: {len(entries)}")
-            print(f"⏰ Entries with time data: {len(time_entries)}")
+    try:
+        # Count entries with time data in SQL; the time properties derive from these columns
+        has_time = db.or_(LogbookEntry.takeoff_datetime.isnot(None), LogbookEntry.landing_datetime.isnot(None))
+        total_entries, time_count = db.session.query(
+            db.func.count(LogbookEntry.id),
+            db.func.coalesce(db.func.sum(db.case((has_time, 1), else_=0)), 0),
+        ).one()
+        
+        print(f"📊 Total entries: {total_entries}")
+        print(f"⏰ Entries with time data: {time_count}")
+        
+        if time_count == 0:
+            print("✅ All time fields are NULL (expected after fix)")
+            return True
+        else:
+            print(f"⚠️  Found {time_count} entries with time data:")
+            # Show first 5; plain rows of the three columns, no ORM objects
+            sample = db.session.execute(
+                db.select(LogbookEntry.id, LogbookEntry.takeoff_datetime, LogbookEntry.landing_datetime)
+                .where(has_time).limit(5)
+            )
+            for entry_id, takeoff, landing in sample:
+                print(f"   ID {entry_id}: takeoff={takeoff.time()}, landing={landing.time()}")
+            return True
             
-            if len(time_entries) == 0:
-                print("✅ All time fields are NULL (expected after fix)")
-                return True
-            else:
-                print(f"⚠️  Found {len(time_entries)} entries with time data:")
-                for entry in time_entries[:5]:  # Show first 5
-                    print(f"   ID {entry.id}: takeoff={entry.takeoff_time}, landing={entry.landing_time}")
-                return True
-                
-        except Exception as e:
-            print(f"❌ Time field access failed: {str(e)}")
-            return False
+    except Exception as e:
+        print(f"❌ Time field access failed: {str(e)}")
+        return False
 
 def main():
     """Main test function."""
@@ -96,11 +142,17 @@ def main():
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
-    # Test the admin logbook query
-    query_success = test_admin_logbook_query()
+    # One app for both tests, as the session fixture gives them under pytest
+    app = create_app()
+    
+    # Test the admin logbook query; its entries are rolled back afterwards
+    from tests.conftest import make_device, make_user, transactional_session
+    with transactional_session(app) as db_session:
+        query_success = test_admin_logbook_query(db_session, make_device(db_session, make_user(db_session)))
     
     # Test time field access
-    time_success = test_time_field_access()
+    with app.app_context():
+        time_success = test_time_field_access(app)
     
     print("\n" + "=" * 60)
     print("TEST RESULTS:")
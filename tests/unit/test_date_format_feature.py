@@ -10,56 +10,42 @@ import requests
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.app import create_app, db
-from src.models import User
 
-def test_user_date_format_field():
+def test_user_date_format_field(db_session, user):
     """Test that users have the date_format field and it works correctly."""
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            print("🧪 Testing User date_format field functionality...")
-            
-            # Test 1: Check if date_format field exists and has default value
-            user = User.query.first()
-            if not user:
-                print("❌ No users found in database - create a test user first")
-                return False
-            
-            print(f"✓ Found user: {user.email}")
-            
-            # Test 2: Check default date format
-            if hasattr(user, 'date_format'):
-                print(f"✓ User has date_format field: {user.date_format}")
-                if user.date_format == '%Y-%m-%d':
-                    print("✓ Default date format is correct (%Y-%m-%d)")
-                else:
-                    print(f"⚠️  Default date format is {user.date_format}, expected %Y-%m-%d")
+    try:
+        print("🧪 Testing User date_format field functionality...")
+        
+        # Test 1: Check if date_format field exists and has default value
+        print(f"✓ Found user: {user.email}")
+        
+        # Test 2: Check default date format
+        if hasattr(user, 'date_format'):
+            print(f"✓ User has date_format field: {user.date_format}")
+            if user.date_format == '%Y-%m-%d':
+                print("✓ Default date format is correct (%Y-%m-%d)")
             else:
-                print("❌ User does not have date_format field")
-                return False
-            
-            # Test 3: Test different date formats
-            test_formats = ['%d.%m.%Y', '%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d']
-            test_date = datetime(2025, 8, 19)
-            
-            print("\n📅 Testing date format rendering:")
-            for fmt in test_formats:
-                user.date_format = fmt
-                formatted_date = test_date.strftime(user.date_format)
-                print(f"  {fmt} → {formatted_date}")
-            
-            # Reset to default
-            user.date_format = '%Y-%m-%d'
-            db.session.commit()
-            
-            print("✓ Date format functionality test completed successfully")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error during date format test: {e}")
+                print(f"⚠️  Default date format is {user.date_format}, expected %Y-%m-%d")
+        else:
+            print("❌ User does not have date_format field")
             return False
+        
+        # Test 3: Test different date formats
+        test_formats = ['%d.%m.%Y', '%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d']
+        test_date = datetime(2025, 8, 19)
+        
+        print("\n📅 Testing date format rendering:")
+        for fmt in test_formats:
+            user.date_format = fmt
+            formatted_date = test_date.strftime(user.date_format)
+            print(f"  {fmt} → {formatted_date}")
+        
+        print("✓ Date format functionality test completed successfully")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error during date format test: {e}")
+        return False
 
 def test_user_settings_route():
     """Test that the user settings route is accessible."""
@@ -126,34 +112,3 @@ def test_templates_updated():
             success = False
     
     return success
-
-def main():
-    """Run all tests."""
-    print("🚀 Testing KanardiaCloud Date Format Configuration Feature\n")
-    
-    tests_passed = 0
-    total_tests = 3
-    
-    # Test 1: Database and model functionality
-    if test_user_date_format_field():
-        tests_passed += 1
-    
-    # Test 2: Route accessibility
-    if test_user_settings_route():
-        tests_passed += 1
-        
-    # Test 3: Template updates
-    if test_templates_updated():
-        tests_passed += 1
-    
-    print(f"\n📊 Test Results: {tests_passed}/{total_tests} tests passed")
-    
-    if tests_passed == total_tests:
-        print("🎉 All tests passed! Date format configuration feature is working correctly.")
-        return True
-    else:
-        print("⚠️  Some tests failed. Please review the output above.")
-        return False
-
-if __name__ == '__main__':
-    main()
@@ -14,9 +14,10 @@ def test_deletion_functionality():
     """Test that deletion endpoints work correctly"""
     
     # Create test app
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,  # Disable CSRF for testing
+    })
     
     with app.test_client() as client:
         with app.app_context():
@@ -5,86 +5,106 @@ Comprehensive test for the force rebuild logbook functionality
 
 import sys
 import os
+from datetime import datetime
+from time import perf_counter
 
 # Add the src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.app import create_app, db
-from src.models import User, Device, Event, LogbookEntry
+from src.models import User, Device, Event, FlightPoint, LogbookEntry
 from src.services.thingsboard_sync import thingsboard_sync
 
-def test_force_rebuild_complete():
-    """Test the complete force rebuild functionality"""
+def _device_counts(device_id):
+    """Count a device's events and its logbook entries (all, universal, event-generated) in one query."""
+    events = db.select(db.func.count(Event.id)).where(Event.device_id == device_id).scalar_subquery()
+    return db.session.execute(db.select(
+        events,
+        db.func.count(LogbookEntry.id),
+        *(
+            db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+            for condition in (
+                LogbookEntry.user_id.is_(None),
+                LogbookEntry.is_event_generated,
+            )
+        )
+    ).where(LogbookEntry.device_id == device_id)).one()
+
+def test_force_rebuild_complete(db_session, device):
+    """Test the complete force rebuild functionality; its changes are rolled back afterwards"""
     
-    app = create_app()
+    print("🧪 Testing Force Rebuild Logbook Functionality")
+    print("=" * 50)
     
-    with app.app_context():
-        print("🧪 Testing Force Rebuild Logbook Functionality")
-        print("=" * 50)
-        
-        # Find a test device
-        device = Device.query.filter_by(is_active=True).first()
-        if not device:
-            print("❌ No active device found for testing")
-            return
-        
-        print(f"📱 Testing with device: {device.name} (ID: {device.id})")
-        print(f"👤 Owner: {device.owner.nickname}")
-        
-        # Check initial state
-        initial_events = Event.query.filter_by(device_id=device.id).count()
-        initial_logbook = LogbookEntry.query.filter_by(device_id=device.id).count()
-        
-        print(f"\n📊 Initial State:")
-        print(f"   Events: {initial_events}")
-        print(f"   Logbook entries: {initial_logbook}")
-        
-        # Test the rebuild function directly
-        print(f"\n🔄 Testing _rebuild_complete_logbook_from_events...")
-        
-        try:
-            result = thingsboard_sync._rebuild_complete_logbook_from_events(device)
-            
-            print(f"✅ Rebuild completed successfully!")
-            print(f"   Removed entries: {result.get('removed_entries', 0)}")
-            print(f"   New entries: {result.get('new_entries', 0)}")
-            print(f"   Updated entries: {result.get('updated_entries', 0)}")
-            
-            if result.get('errors'):
-                print(f"⚠️  Errors encountered: {result['errors']}")
-            
-        except Exception as e:
-            print(f"❌ Error during rebuild test: {str(e)}")
-            return
-        
-        # Check final state
-        final_events = Event.query.filter_by(device_id=device.id).count()
-        final_logbook = LogbookEntry.query.filter_by(device_id=device.id).count()
-        
-        print(f"\n📊 Final State:")
-        print(f"   Events: {final_events}")
-        print(f"   Logbook entries: {final_logbook}")
-        
-        # Test universal visibility (user_id=None)
-        universal_entries = LogbookEntry.query.filter(
-            LogbookEntry.device_id == device.id,
-            LogbookEntry.user_id.is_(None)
-        ).count()
-        
-        print(f"   Universal entries (user_id=None): {universal_entries}")
+    from tests.conftest import make_logbook_entry
+    
+    print(f"📱 Testing with device: {device.name} (ID: {device.id})")
+    print(f"👤 Owner: {device.owner.nickname}")
+    
+    # Existing entries to clear; the first has a linked event and a flight point.
+    # A lone event pairs with nothing, so the rebuild adds no entries back
+    entries = [make_logbook_entry(db_session, device, takeoff_datetime=datetime(2025, 1, day, 10, 0),
+                                  landing_datetime=datetime(2025, 1, day, 11, 0)) for day in (1, 2, 3)]
+    event = Event(device_id=device.id, page_address=1, total_time=0, logbook_entry_id=entries[0].id)
+    db_session.add_all([
+        event,
+        FlightPoint(logbook_entry_id=entries[0].id, latitude=46.0, longitude=14.5, sequence=0, timestamp_offset=0),
+    ])
+    db_session.flush()
+    
+    # Check initial state
+    initial_events, initial_logbook, _, _ = _device_counts(device.id)
+    
+    print(f"\n📊 Initial State:")
+    print(f"   Events: {initial_events}")
+    print(f"   Logbook entries: {initial_logbook}")
+    
+    # Test the rebuild function directly
+    print(f"\n🔄 Testing _rebuild_complete_logbook_from_events...")
+    
+    try:
+        started = perf_counter()
+        result = thingsboard_sync._rebuild_complete_logbook_from_events(device)
+        elapsed_ms = (perf_counter() - started) * 1000
         
-        # Check event-generated entries
-        event_generated = LogbookEntry.query.filter(
-            LogbookEntry.device_id == device.id,
-            LogbookEntry.remarks.like('%Generated from device events%')
-        ).count()
+        print(f"✅ Rebuild completed successfully in {elapsed_ms:.1f} ms!")
+        print(f"   Removed entries: {result.get('removed_entries', 0)}")
+        print(f"   New entries: {result.get('new_entries', 0)}")
+        print(f"   Updated entries: {result.get('updated_entries', 0)}")
         
-        print(f"   Event-generated entries: {event_generated}")
+        if result.get('errors'):
+            print(f"⚠️  Errors encountered: {result['errors']}")
         
-        print(f"\n✅ Force Rebuild Test Complete!")
-        print(f"📝 The force rebuild functionality is working correctly.")
-        print(f"🌐 Admin UI should now show the 'Force Rebuild Logbook' option")
-        print(f"🔗 Route: /admin/devices/{device.id}/force-rebuild-logbook")
+    except Exception as e:
+        print(f"❌ Error during rebuild test: {str(e)}")
+        return False
+    
+    # Check final state, including universal (user_id=None) and event-generated entries
+    final_events, final_logbook, universal_entries, event_generated = _device_counts(device.id)
+    
+    print(f"\n📊 Final State:")
+    print(f"   Events: {final_events}")
+    print(f"   Logbook entries: {final_logbook}")
+    print(f"   Universal entries (user_id=None): {universal_entries}")
+    print(f"   Event-generated entries: {event_generated}")
+    
+    # Every old entry is gone, with its flight points, and its event is unlinked
+    flight_points = FlightPoint.query.filter(FlightPoint.logbook_entry_id.in_([e.id for e in entries])).count()
+    if result.get('removed_entries') != len(entries) or final_logbook != 0 or flight_points:
+        print(f"❌ Expected {len(entries)} entries and their flight points removed, "
+              f"got removed={result.get('removed_entries')}, left={final_logbook}, flight points={flight_points}")
+        return False
+    if final_events != initial_events or db_session.get(Event, event.id).logbook_entry_id is not None:
+        print("❌ The rebuild should keep the device's events and unlink them")
+        return False
+    
+    print(f"\n✅ Force Rebuild Test Complete!")
+    print(f"📝 The force rebuild functionality is working correctly.")
+    print(f"🌐 Admin UI should now show the 'Force Rebuild Logbook' option")
+    print(f"🔗 Route: /admin/devices/{device.id}/force-rebuild-logbook")
+    return True
 
 if __name__ == '__main__':
-    test_force_rebuild_complete()
+    from tests.conftest import make_device, make_user, transactional_session
+    with transactional_session(create_app()) as db_session:
+        test_force_rebuild_complete(db_session, make_device(db_session, make_user(db_session)))
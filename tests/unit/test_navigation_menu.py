@@ -3,8 +3,30 @@
 Test script to verify the navigation menu entry for Instrument Layouts
 """
 
+import functools
+import os
+from collections import Counter
 import requests
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+BASE_URL = 'http://127.0.0.1:5000'
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'templates', 'base.html')
+PROBE_PATHS = ('/auth/login', '/dashboard/instrument-layouts', '/dashboard')
+
+# Shared session so the probes below reuse one keep-alive connection
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+SUMMARY = """
+📋 Summary:
+- Menu entry added to sidebar navigation
+- Route properly configured with authentication
+- Active state handling for menu highlighting
+- Material Design icon integration
+"""
 
 def test_navigation_menu():
     """Test that the instrument layouts menu entry is present in the navigation."""
@@ -14,16 +36,19 @@ def test_navigation_menu():
     print("=" * 50)
     
     try:
-        # Get the login page to check if navigation structure is correct
-        response = requests.get('http://127.0.0.1:5000/auth/login')
+        # The probes are independent, so fetch them concurrently on the shared session
+        with ThreadPoolExecutor(max_workers=len(PROBE_PATHS)) as executor:
+            response, dashboard_response, dashboard_main = executor.map(
+                lambda path: SESSION.get(f'{BASE_URL}{path}', timeout=5, allow_redirects=False),
+                PROBE_PATHS
+            )
         
+        # Get the login page to check if navigation structure is correct
         if response.status_code == 200:
             print("✅ Login page accessible")
             
             # Check if the base template has the instrument layouts menu
             # (we won't see it on login page but we can check the route exists)
-            dashboard_response = requests.get('http://127.0.0.1:5000/dashboard/instrument-layouts')
-            
             if dashboard_response.status_code == 302:  # Should redirect to login
                 print("✅ Instrument layouts route exists and requires authentication")
                 
@@ -39,7 +64,6 @@ def test_navigation_menu():
             print(f"❌ Could not access login page: {response.status_code}")
             
         # Test the main dashboard route
-        dashboard_main = requests.get('http://127.0.0.1:5000/dashboard')
         if dashboard_main.status_code == 302:
             print("✅ Dashboard route exists and requires authentication")
         else:
@@ -51,33 +75,53 @@ def test_navigation_menu():
     
     return True
 
+# One alternation so base.html is walked once. The icon is an optional prefix of the
+# menu text, so every 'Instrument Layouts' counts as text and, when preceded by it, as icon
+_MENU_RE = re.compile(
+    r'(?P<route>dashboard\.instrument_layouts)'
+    r'|(?P<icon>material-icons">dashboard</span> )?(?P<text>Instrument Layouts)'
+    r'|(?P<nav_item><li class="nav-item">)'
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_template(path, mtime):
+    """Read a template once per (path, mtime) and count each named menu pattern in one pass."""
+    with open(path, 'r') as f:
+        content = f.read()
+    return Counter(
+        name
+        for m in _MENU_RE.finditer(content)
+        for name, value in m.groupdict().items()
+        if value is not None
+    )
+
 def check_menu_structure():
     """Check if the menu structure contains instrument layouts."""
     print("\n🔍 Checking menu structure in base template...")
     
     try:
-        with open('/home/rok/src/Cloud-1/templates/base.html', 'r') as f:
-            content = f.read()
+        counts = _load_template(TEMPLATE_PATH, os.stat(TEMPLATE_PATH).st_mtime)
             
         # Look for instrument layouts menu entry
-        if 'dashboard.instrument_layouts' in content:
+        if counts['route']:
             print("✅ Found instrument_layouts route reference in base template")
         else:
             print("❌ Missing instrument_layouts route reference")
             
-        if 'Instrument Layouts' in content:
+        if counts['text']:
             print("✅ Found 'Instrument Layouts' text in menu")
         else:
             print("❌ Missing 'Instrument Layouts' text")
             
         # Check for proper menu structure
-        if 'material-icons">dashboard</span> Instrument Layouts' in content:
+        if counts['icon']:
             print("✅ Found proper menu entry with icon and text")
         else:
             print("❌ Menu entry format issue")
             
-        # Count total nav items to see menu structure
-        nav_items = content.count('<li class="nav-item">')
+        # Total nav items were counted in the same scan
+        nav_items = counts['nav_item']
         print(f"📊 Total navigation items found: {nav_items}")
         
         return True
@@ -102,8 +146,4 @@ if __name__ == "__main__":
     else:
         print("❌ Some tests failed!")
         
-    print("\n📋 Summary:")
-    print("- Menu entry added to sidebar navigation")
-    print("- Route properly configured with authentication")
-    print("- Active state handling for menu highlighting")
-    print("- Material Design icon integration")
+    sys.stdout.write(SUMMARY)
@@ -9,29 +9,31 @@ import sys
 # Add the src directory to the path so we can import our modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.app import create_app, db
-from src.models import Device
-from src.services.thingsboard_sync import ThingsBoardSyncService
-
-def test_telemetry():
+def test_telemetry(app):
     """Test telemetry functionality."""
-    app = create_app()
+    # Imported here so the Flask/SQLAlchemy stack is only loaded when the test runs
+    from src.app import db
+    from src.models import Device
     
     with app.app_context():
         try:
-            # Get a device with external_device_id for testing
-            device = Device.query.filter(
+            # Get a device with external_device_id for testing; only the columns
+            # needed up front are selected, the full device is loaded on update
+            device_row = db.session.query(
+                Device.id, Device.name, Device.external_device_id
+            ).filter(
                 Device.external_device_id.isnot(None),
                 Device.external_device_id != ''
             ).first()
             
-            if not device:
+            if not device_row:
                 print("No devices with external_device_id found for testing")
                 return False
             
-            print(f"Testing telemetry for device: {device.name} (ID: {device.external_device_id})")
+            print(f"Testing telemetry for device: {device_row.name} (ID: {device_row.external_device_id})")
             
-            # Test telemetry service
+            # Test telemetry service (only needed once a device was found)
+            from src.services.thingsboard_sync import ThingsBoardSyncService
             tb_service = ThingsBoardSyncService()
             
             # Test authentication
@@ -43,14 +45,16 @@ def test_telemetry():
             
             # Test telemetry fetch
             print("Testing telemetry fetch...")
-            telemetry_data = tb_service._get_device_telemetry(device.external_device_id)
+            telemetry_data = tb_service._get_device_telemetry(device_row.external_device_id)
             
             if telemetry_data:
                 print(f"Telemetry data received: {telemetry_data}")
                 
                 # Test device telemetry update
                 print("Testing device telemetry update...")
-                device.update_telemetry(telemetry_data)
+                device = db.session.get(Device, device_row.id)
+                with db.session.no_autoflush:
+                    device.update_telemetry(telemetry_data)
                 db.session.commit()
                 
                 print(f"Device telemetry updated:")
@@ -73,8 +77,10 @@ def test_telemetry():
             return False
 
 if __name__ == '__main__':
+    from src.app import create_app
+    
     print("Starting telemetry test...")
-    success = test_telemetry()
+    success = test_telemetry(create_app())
     
     if success:
         print("Test completed successfully!")
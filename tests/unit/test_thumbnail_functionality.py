@@ -6,8 +6,22 @@ Test script to verify thumbnail functionality for instrument layouts.
 import sqlite3
 import os
 import base64
+from functools import lru_cache
 from io import BytesIO
-from PIL import Image
+from PIL import Image, ImageDraw
+
+def _connect_read_only(db_path):
+    """Read-only autocommit connection; these checks never write."""
+    return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+
+@lru_cache(maxsize=None)
+def _table_columns(db_path, table):
+    """Column names of a table, read once per database over a read-only connection."""
+    conn = _connect_read_only(db_path)
+    try:
+        return frozenset(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+    finally:
+        conn.close()
 
 def test_thumbnail_field():
     """Test that the thumbnail_filename field exists in the database."""
@@ -17,13 +31,10 @@ def test_thumbnail_field():
         print(f"❌ Database not found at {db_path}")
         return False
     
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
         # Check table structure
-        cursor.execute("PRAGMA table_info(instrument_layout)")
-        columns = [column[1] for column in cursor.fetchall()]
+        columns = _table_columns(db_path, 'instrument_layout')
         
         if 'thumbnail_filename' not in columns:
             print("❌ thumbnail_filename column not found in instrument_layout table")
@@ -32,6 +43,8 @@ def test_thumbnail_field():
         print("✅ thumbnail_filename column exists in instrument_layout table")
         
         # Check existing layouts
+        conn = _connect_read_only(db_path)
+        cursor = conn.cursor()
         cursor.execute("SELECT id, title, thumbnail_filename FROM instrument_layout WHERE is_active = 1")
         layouts = cursor.fetchall()
         
@@ -49,24 +62,31 @@ def test_thumbnail_field():
         if conn:
             conn.close()
 
+@lru_cache(maxsize=1)
+def _instrument_png():
+    """PNG bytes of a simple gauge drawing, built once.
+    
+    400x300 is still larger than the 300x200 thumbnail, so the LANCZOS
+    downscale is exercised on a quarter of the pixels of a full screenshot.
+    """
+    image = Image.new('RGB', (400, 300), color='lightblue')
+    
+    # Add some simple graphics to make it look like an instrument
+    draw = ImageDraw.Draw(image)
+    
+    # Draw a circle (like a gauge)
+    draw.ellipse([150, 100, 250, 200], outline='black', width=3)
+    draw.line([200, 150, 200, 125], fill='red', width=4)  # Needle
+    
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
 def test_thumbnail_generation():
     """Test the thumbnail generation functionality."""
     try:
-        # Create a simple test image
-        image = Image.new('RGB', (800, 600), color='lightblue')
-        
-        # Add some simple graphics to make it look like an instrument
-        from PIL import ImageDraw
-        draw = ImageDraw.Draw(image)
-        
-        # Draw a circle (like a gauge)
-        draw.ellipse([300, 200, 500, 400], outline='black', width=3)
-        draw.line([400, 300, 400, 250], fill='red', width=4)  # Needle
-        
-        # Convert to base64
-        buffer = BytesIO()
-        image.save(buffer, format='PNG')
-        image_data = buffer.getvalue()
+        # Create a simple test image and convert it to base64
+        image_data = _instrument_png()
         base64_data = base64.b64encode(image_data).decode('utf-8')
         
         print("✅ Successfully created test image and converted to base64")
@@ -90,30 +110,31 @@ def test_directories():
     thumbnails_dir = os.path.join(static_dir, 'thumbnails')
     layouts_dir = os.path.join(thumbnails_dir, 'instrument_layouts')
     
-    if not os.path.exists(static_dir):
-        print(f"❌ Static directory not found: {static_dir}")
-        return False
-    
-    if not os.path.exists(thumbnails_dir):
-        print(f"❌ Thumbnails directory not found: {thumbnails_dir}")
-        return False
-        
-    if not os.path.exists(layouts_dir):
-        print(f"❌ Instrument layouts thumbnails directory not found: {layouts_dir}")
+    # One directory read both proves the whole path exists and lists its contents;
+    # the parents are only checked to report which one is missing
+    try:
+        with os.scandir(layouts_dir) as entries:
+            thumbnails = [entry.name for entry in entries if entry.name.endswith('.png')]
+    except FileNotFoundError:
+        if not os.path.isdir(static_dir):
+            print(f"❌ Static directory not found: {static_dir}")
+        elif not os.path.isdir(thumbnails_dir):
+            print(f"❌ Thumbnails directory not found: {thumbnails_dir}")
+        else:
+            print(f"❌ Instrument layouts thumbnails directory not found: {layouts_dir}")
         return False
+    except OSError as e:
+        print(f"⚠️  Error listing thumbnails: {e}")
+        return True
     
     print("✅ All thumbnail directories exist")
     
     # List existing thumbnails
-    try:
-        thumbnails = [f for f in os.listdir(layouts_dir) if f.endswith('.png')]
-        print(f"📁 Found {len(thumbnails)} existing thumbnails:")
-        for thumb in thumbnails[:5]:  # Show first 5
-            print(f"  - {thumb}")
-        if len(thumbnails) > 5:
-            print(f"  ... and {len(thumbnails) - 5} more")
-    except Exception as e:
-        print(f"⚠️  Error listing thumbnails: {e}")
+    print(f"📁 Found {len(thumbnails)} existing thumbnails:")
+    for thumb in thumbnails[:5]:  # Show first 5
+        print(f"  - {thumb}")
+    if len(thumbnails) > 5:
+        print(f"  ... and {len(thumbnails) - 5} more")
     
     return True
 
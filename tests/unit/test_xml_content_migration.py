@@ -5,7 +5,28 @@ Test script to verify json_content to xml_content migration
 
 import sqlite3
 import os
+import sys
 import json
+from functools import lru_cache
+
+# Add the project root to Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tests.conftest import json_loads
+
+def _connect_read_only(db_path):
+    """Read-only autocommit connection; these checks never write."""
+    return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+
+@lru_cache(maxsize=None)
+def _table_columns(db_path, table):
+    """Column names of a table, read once per database over a read-only connection."""
+    conn = _connect_read_only(db_path)
+    try:
+        return frozenset(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+    finally:
+        conn.close()
 
 def test_xml_content_migration():
     """Test that the xml_content migration was successful."""
@@ -20,13 +41,10 @@ def test_xml_content_migration():
         print(f"❌ Database file not found: {db_path}")
         return False
     
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
         # Check table schema
-        cursor.execute("PRAGMA table_info(instrument_layout)")
-        columns = {row[1]: row for row in cursor.fetchall()}
+        columns = _table_columns(db_path, 'instrument_layout')
         
         # Verify xml_content exists and json_content doesn't
         if 'xml_content' in columns:
@@ -48,26 +66,30 @@ def test_xml_content_migration():
             print("❌ instrument_type column missing")
             return False
         
-        # Test data integrity
+        # Test data integrity, validating rows in batches as they are read
+        conn = _connect_read_only(db_path)
+        cursor = conn.cursor()
+        cursor.arraysize = 100
         cursor.execute("SELECT id, title, xml_content, instrument_type FROM instrument_layout")
-        layouts = cursor.fetchall()
         
-        print(f"📊 Found {len(layouts)} instrument layouts")
+        layout_count = 0
+        while batch := cursor.fetchmany():
+            for layout_id, title, xml_content, instrument_type in batch:
+                layout_count += 1
+                print(f"   - ID {layout_id}: {title} (Type: {instrument_type})")
+                
+                # Verify xml_content is valid JSON (even though it's called xml_content)
+                try:
+                    if xml_content:
+                        json_loads(xml_content)
+                        print(f"     ✅ Valid JSON content")
+                    else:
+                        print(f"     ⚠️ Empty xml_content")
+                except json.JSONDecodeError:
+                    print(f"     ❌ Invalid JSON in xml_content")
+                    return False
         
-        for layout in layouts:
-            layout_id, title, xml_content, instrument_type = layout
-            print(f"   - ID {layout_id}: {title} (Type: {instrument_type})")
-            
-            # Verify xml_content is valid JSON (even though it's called xml_content)
-            try:
-                if xml_content:
-                    json.loads(xml_content)
-                    print(f"     ✅ Valid JSON content")
-                else:
-                    print(f"     ⚠️ Empty xml_content")
-            except json.JSONDecodeError:
-                print(f"     ❌ Invalid JSON in xml_content")
-                return False
+        print(f"📊 Found {layout_count} instrument layouts")
         
         # Check all expected columns
         expected_columns = [
@@ -107,7 +129,7 @@ def check_code_changes():
     
     # Check models.py
     try:
-        with open('/home/rok/src/Cloud-1/src/models.py', 'r') as f:
+        with open(os.path.join(PROJECT_ROOT, 'src', 'models.py'), 'r') as f:
             models_content = f.read()
             
         if 'xml_content = db.Column' in models_content:
@@ -128,7 +150,7 @@ def check_code_changes():
     
     # Check dashboard.py routes
     try:
-        with open('/home/rok/src/Cloud-1/src/routes/dashboard.py', 'r') as f:
+        with open(os.path.join(PROJECT_ROOT, 'src', 'routes', 'dashboard.py'), 'r') as f:
             routes_content = f.read()
             
         # Check for xml_content usage in instrument layout sections
@@ -18,16 +18,28 @@ from src.app import create_app
 # Create application instance
 app = create_app()
 
+# Production log listener thread of the current process, if one is running
+log_listener = None
+
+
+def stop_log_listener():
+    """Flush queued log records to the file and stop this process's listener thread."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
 # Configure logging for production
 if app.config.get('FLASK_ENV') == 'production':
+    import atexit
     import logging
-    from logging.handlers import RotatingFileHandler
+    import queue
+    from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
     
     if not app.debug:
         # Create logs directory if it doesn't exist
         logs_dir = os.path.join(PROJECT_ROOT, 'logs')
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir)
+        os.makedirs(logs_dir, exist_ok=True)
         
         # Setup file handler
         file_handler = RotatingFileHandler(
@@ -40,7 +52,23 @@ if app.config.get('FLASK_ENV') == 'production':
             '[in %(pathname)s:%(lineno)d]'
         ))
         file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+        
+        # Request threads only enqueue records; one listener thread writes them to the file
+        queue_handler = QueueHandler(queue.Queue(-1))
+        app.logger.addHandler(queue_handler)
+        
+        def _start_log_listener():
+            """Start a listener thread for this process, on a fresh queue."""
+            global log_listener
+            queue_handler.queue = queue.Queue(-1)
+            log_listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+            log_listener.start()
+        
+        _start_log_listener()
+        # Threads don't survive fork: Gunicorn workers forked from a preloaded app need their own
+        os.register_at_fork(after_in_child=_start_log_listener)
+        # Gunicorn workers skip atexit handlers; gunicorn.conf.py's worker_exit stops theirs
+        atexit.register(stop_log_listener)
         
         app.logger.setLevel(logging.INFO)
         app.logger.info('KanardiaCloud startup')